@@ -0,0 +1,222 @@
+"""Benchmark the frame generation and encoding hot path.
+
+Runs over synthetic images so results only depend on the code and the
+machine. Compare JSON output between commits on the same machine:
+
+    python benchmark.py --resolutions 540 1080 --frames 24 120 --output bench.json
+
+Stages reported for every resolution x frame count:
+  - load:          decoding and resizing both source images, with an empty
+                   source cache and hashes known as for uploads (ms, once per job)
+  - effect:<name>: each registered effect on its own (ms/frame)
+  - render:        render_3d_frame with the default and with all effects (ms/frame)
+  - encode:        write_video_from_frames on pre-rendered frames (ms/frame)
+  - encode:<name>: the same with each encoder profile (ms/frame and bytes)
+  - encode_png:    the debug PNG path, create_video_from_frames (ms/frame, --include-png)
+  - end_to_end:    render + encode streamed together (ms/frame and frames/s)
+
+peak_rss_mb is the process peak so far after each combination.
+"""
+from pathlib import Path
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import DEFAULT_3D_EFFECTS, FPS
+from services import frame_generator_3d
+from services.effect_registry import list_effects
+from services.encode_profile import ENCODE_PROFILES
+from services.frame_buffers import FrameRing
+from services.frame_generator_3d import render_3d_frame
+from services.image_loader import clear_cache
+from services.render_profile import scale_for
+from services.transform_plan import build_motion_plan
+from services.video_creator import create_video_from_frames, write_video_from_frames
+from utils.file_manager import file_sha256
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=Path(__file__).parent, timeout=5
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def synthetic_image(size: tuple[int, int], seed: int) -> np.ndarray:
+    """Smooth gradients plus shapes, closer to a product photo than noise (BGR)."""
+    w, h = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.empty((h, w, 3), dtype=np.uint8)
+    for c in range(3):
+        fx, fy = rng.uniform(0.5, 3, size=2)
+        img[:, :, c] = (127 + 100 * np.sin(fx * x / w * np.pi) * np.cos(fy * y / h * np.pi)).astype(np.uint8)
+    for _ in range(8):
+        center = (int(rng.integers(0, w)), int(rng.integers(0, h)))
+        color = tuple(int(v) for v in rng.integers(0, 255, size=3))
+        cv2.circle(img, center, int(rng.integers(w // 20, w // 5)), color, -1)
+    return img
+
+
+def _time_per_frame(fn, frame_count: int) -> float:
+    start = time.perf_counter()
+    for i in range(frame_count):
+        fn(i)
+    return 1000 * (time.perf_counter() - start) / frame_count
+
+
+def run_case(size: tuple[int, int], frame_count: int, workdir: Path, include_png: bool) -> dict:
+    w, h = size
+    arr1 = synthetic_image(size, 1)
+    arr2 = synthetic_image(size, 2)
+    stages = {}
+
+    # Source decode + resize, from full-size JPEGs as uploaded
+    src1, src2 = workdir / "src1.jpg", workdir / "src2.jpg"
+    Image.fromarray(cv2.cvtColor(synthetic_image((w * 2, h * 2), 3), cv2.COLOR_BGR2RGB)).save(src1, quality=90)
+    Image.fromarray(cv2.cvtColor(synthetic_image((w * 2, h * 2), 4), cv2.COLOR_BGR2RGB)).save(src2, quality=90)
+    # Cases share file names, so start from an empty cache to time a real decode
+    hashes = (file_sha256(src1), file_sha256(src2))
+    clear_cache()
+    start = time.perf_counter()
+    frame_generator_3d.load_source_images(src1, src2, size, hashes)
+    stages["load"] = {"ms": round(1000 * (time.perf_counter() - start), 3)}
+
+    # Each effect on its own, with params scaled to the frame size as the
+    # pipeline does; motion blur follows every geometric effect
+    scale = scale_for(size)
+    params = {effect.name: effect.scale_params(dict(effect.params), scale) for effect in list_effects()}
+    geometric = tuple(
+        (effect.matrix, tuple(sorted(params[effect.name].items())))
+        for effect in list_effects() if effect.fusable
+    )
+    motion = build_motion_plan(geometric, frame_count, size)
+    for effect in list_effects():
+        def run(i, effect=effect):
+            extra = {"motion": motion[i]} if effect.uses_motion else {}
+            effect.apply(arr1, i / max(frame_count - 1, 1), **params[effect.name], **extra)
+        stages[f"effect:{effect.name}"] = {"ms_per_frame": round(_time_per_frame(run, frame_count), 3)}
+
+    # Full frame renders
+    all_effects = {effect.name: True for effect in list_effects()}
+    for label, effects in (("render:default", DEFAULT_3D_EFFECTS), ("render:all", all_effects)):
+        ms = _time_per_frame(lambda i: render_3d_frame(arr1, arr2, i, frame_count, effects), frame_count)
+        stages[label] = {"ms_per_frame": round(ms, 3)}
+
+    frames = [render_3d_frame(arr1, arr2, i, frame_count, DEFAULT_3D_EFFECTS) for i in range(frame_count)]
+
+    # Encode only
+    start = time.perf_counter()
+    write_video_from_frames(iter(frames), workdir / "encode.mp4", fps=FPS)
+    stages["encode"] = {"ms_per_frame": round(1000 * (time.perf_counter() - start) / frame_count, 3)}
+
+    for name, encoding in ENCODE_PROFILES.items():
+        start = time.perf_counter()
+        path = write_video_from_frames(iter(frames), workdir / f"encode_{name}.mp4", fps=FPS, encoding=encoding)
+        stages[f"encode:{name}"] = {
+            "ms_per_frame": round(1000 * (time.perf_counter() - start) / frame_count, 3),
+            "bytes": path.stat().st_size,
+        }
+
+    if include_png:
+        png_dir = workdir / "png"
+        png_dir.mkdir(exist_ok=True)
+        start = time.perf_counter()
+        for i, frame in enumerate(frames):
+            Image.fromarray(frame).save(png_dir / f"frame_{i:04d}.png")
+        create_video_from_frames(png_dir, workdir / "png.mp4", fps=FPS)
+        stages["encode_png"] = {"ms_per_frame": round(1000 * (time.perf_counter() - start) / frame_count, 3)}
+        for path in png_dir.iterdir():
+            path.unlink()
+    del frames
+
+    # Render and encode streamed together, through an output ring as in production
+    ring = FrameRing(size)
+    start = time.perf_counter()
+    write_video_from_frames(
+        (render_3d_frame(arr1, arr2, i, frame_count, DEFAULT_3D_EFFECTS, out=ring.next()) for i in range(frame_count)),
+        workdir / "e2e.mp4",
+        fps=FPS
+    )
+    elapsed = time.perf_counter() - start
+    stages["end_to_end"] = {
+        "ms_per_frame": round(1000 * elapsed / frame_count, 3),
+        "frames_per_second": round(frame_count / elapsed, 2),
+    }
+
+    return {
+        "resolution": [w, h],
+        "frame_count": frame_count,
+        "stages": stages,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[540, 1080],
+                        help="Square frame sizes in pixels")
+    parser.add_argument("--frames", type=int, nargs="+", default=[24, 120],
+                        help="Frame counts per video")
+    parser.add_argument("--include-png", action="store_true",
+                        help="Also time the debug PNG sequence path")
+    parser.add_argument("--output", type=Path, help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _git_commit(),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "cv2_threads": cv2.getNumThreads(),
+        },
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        for resolution in args.resolutions:
+            for frame_count in args.frames:
+                result = run_case((resolution, resolution), frame_count, Path(tmp), args.include_png)
+                report["results"].append(result)
+                print(f"{resolution}px x {frame_count} frames: "
+                      f"{result['stages']['end_to_end']['ms_per_frame']} ms/frame end to end",
+                      file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
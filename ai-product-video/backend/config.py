@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -7,11 +8,82 @@ OUTPUT_DIR = BASE_DIR / "outputs"
 
 # Video settings
 FPS = 24
+RESOLUTION = (1080, 1080)  # Output width, height
 FRAME_COUNT = 120  # Smooth transition frames (5 seconds at 24 FPS)
 VIDEO_DURATION = FRAME_COUNT / FPS
 
+# Per-request render profile limits (see services/render_profile.py)
+MIN_FPS = 12
+MAX_FPS = 60
+MIN_VIDEO_DURATION = 1    # Seconds
+MAX_VIDEO_DURATION = int(os.environ.get("MAX_VIDEO_DURATION", "20"))  # Seconds
+
+# Preview proxies (POST /preview): same animation at a fraction of the cost
+PREVIEW_SHORT_SIDE = int(os.environ.get("PREVIEW_SHORT_SIDE", "360"))  # Pixels
+PREVIEW_FPS = int(os.environ.get("PREVIEW_FPS", "8"))
+
+# Encoder (see services/encode_profile.py); 0 lets ffmpeg pick a thread count.
+# With several concurrent renders, capping this avoids oversubscribing cores.
+ENCODE_THREADS = int(os.environ.get("ENCODE_THREADS", "0"))
+
+# Debug: also write every frame as a PNG into the job's frames directory
+# instead of streaming frames straight into the encoder
+DEBUG_SAVE_FRAMES = os.environ.get("DEBUG_SAVE_FRAMES", "").strip().lower() in ("1", "true", "yes")
+
+# Render job queue
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "2"))       # Concurrent renders
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", "8"))     # Waiting renders before 503
+MAX_PROVIDER_JOBS = int(os.environ.get("MAX_PROVIDER_JOBS", "256"))  # Concurrent external provider jobs
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", "3600"))    # Seconds a finished job stays pollable
+PREVIEW_WORKERS = int(os.environ.get("PREVIEW_WORKERS", "1"))     # Concurrent previews (POST /preview)
+MAX_QUEUED_PREVIEWS = int(os.environ.get("MAX_QUEUED_PREVIEWS", "4"))  # Waiting previews before 503
+
+# Live output (?live=true): HLS segment length in seconds, i.e. roughly how
+# much has to render before playback can start
+LIVE_SEGMENT_SECONDS = float(os.environ.get("LIVE_SEGMENT_SECONDS", "1"))
+
+# Cache-Control for finished videos (GET /jobs/{job_id}/video). A job's
+# video never changes, so clients and CDNs may keep it.
+VIDEO_CACHE_CONTROL = os.environ.get("VIDEO_CACHE_CONTROL", "public, max-age=86400, immutable")
+
+# Image sequences (POST /sequences)
+MAX_SEQUENCE_IMAGES = int(os.environ.get("MAX_SEQUENCE_IMAGES", "12"))
+
+# Batch renders (POST /batches)
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "10000"))
+MAX_BATCH_UPLOAD_SIZE = int(os.environ.get("MAX_BATCH_UPLOAD_SIZE", str(2 * 1024 * 1024 * 1024)))  # 2GB zip
+BATCH_QUEUE_DEPTH = int(os.environ.get("BATCH_QUEUE_DEPTH", "2"))  # Render jobs batches keep queued ahead of the workers
+
+# Parallel frame rendering: number of worker processes per render box
+# (0 or 1 renders frames in the job thread)
+RENDER_PROCESSES = int(os.environ.get("RENDER_PROCESSES", "0"))
+
+# Frames dispatched to a render worker per task; the worker renders them one
+# by one straight into shared memory (parallel rendering keeps
+# (RENDER_PROCESSES + 1) blocks of this many frames)
+RENDER_BLOCK_FRAMES = int(os.environ.get("RENDER_BLOCK_FRAMES", "4"))
+
+# Output frames each frame iterator cycles through (see services/frame_buffers.py);
+# a yielded frame stays valid until this many more have been yielded
+FRAME_RING_SIZE = 4
+# Frame sizes each thread keeps working buffers for, most recently used first
+FRAME_BUFFER_CACHE_SIZE = 2
+
+# Render cache: finished videos keyed by image hashes + settings
+RENDER_CACHE_DIR = OUTPUT_DIR / "cache"
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))  # 2GB, 0 disables
+
+# Decoded source images kept in memory, keyed by content hash and size
+SOURCE_CACHE_MAX_BYTES = int(os.environ.get("SOURCE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # 256MB, 0 disables
+
+# Provider HTTP client
+PROVIDER_HTTP_RETRIES = int(os.environ.get("PROVIDER_HTTP_RETRIES", "3"))        # Retries for transient failures
+PROVIDER_HTTP_BACKOFF = float(os.environ.get("PROVIDER_HTTP_BACKOFF", "0.5"))    # Exponential backoff factor (seconds)
+PROVIDER_HTTP_POOL_SIZE = int(os.environ.get("PROVIDER_HTTP_POOL_SIZE", "10"))   # Keep-alive connections per host
+
 # Image constraints
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_IMAGE_PIXELS = 50_000_000      # Reject decompression bombs
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png"}
 
 # 3D Effects (configurable per request)
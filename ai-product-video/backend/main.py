@@ -1,18 +1,39 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from functools import partial
 from pathlib import Path
+import asyncio
 import uuid
 import logging
 import json
 
-from config import UPLOAD_DIR, OUTPUT_DIR, ALLOWED_IMAGE_TYPES, DEFAULT_3D_EFFECTS
+from config import (
+    UPLOAD_DIR,
+    OUTPUT_DIR,
+    ALLOWED_IMAGE_TYPES,
+    DEFAULT_3D_EFFECTS,
+    MAX_BATCH_UPLOAD_SIZE,
+    MAX_SEQUENCE_IMAGES,
+)
 from utils.file_manager import (
     create_directories,
     save_upload_file,
     cleanup_files,
+    SavedUpload,
 )
-from services.video_service import process_images_to_video
+from services.video_service import process_images_to_video, process_sequence_to_video
+from services.jobs import JobManager, QueueFullError, QUEUED, RUNNING, SUCCEEDED, FAILED
+from services.parallel_render import shutdown_pool
+from services.providers_async import call_provider_async, close_async_client
+from services.render_cache import RenderCache, make_cache_key, make_sequence_cache_key
+from services.effect_registry import effect_costs, list_effects, resolve_effects, stage_costs
+from services.metrics import register_callback, render_metrics
+from services.render_profile import RenderProfile, parse_render_profile, profile_options
+from services.encode_profile import DEFAULT_ENCODE_PROFILE, EncodeProfile, encode_options, parse_encode_profile
+from services.preview import PREVIEW_FORMATS, preview_profile, render_preview
+from services.batches import BatchItem, BatchManager, load_batch
+from services.delivery import live_file_response, video_response
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -31,11 +52,44 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Job-Id", "X-Job-Status-Url", "X-Job-Video-Url", "X-Job-Error",
+        "ETag", "Accept-Ranges", "Content-Range",
+    ],
 )
 
 # Create required directories
 create_directories(UPLOAD_DIR, OUTPUT_DIR)
 
+# Render worker pool
+job_manager = JobManager()
+
+# Finished renders keyed by inputs + settings
+render_cache = RenderCache()
+
+# Catalog batches feeding the worker pool
+batch_manager = BatchManager(job_manager)
+
+register_callback("render_jobs_queued", "Render jobs waiting for a worker.", lambda: job_manager.stats()["queued"])
+register_callback("render_jobs_in_flight", "Render jobs currently rendering.", lambda: job_manager.stats()["running"])
+register_callback("render_job_workers", "Size of the render worker pool.", lambda: job_manager.workers)
+register_callback("preview_jobs_in_flight", "Previews rendering or waiting for a preview worker.", lambda: job_manager.stats()["previews_in_flight"])
+register_callback(
+    "render_cache_requests_total", "Render cache lookups by result.",
+    lambda: {("hit",): render_cache.hits, ("miss",): render_cache.misses},
+    labelnames=("result",), kind="counter"
+)
+register_callback("render_cache_evictions_total", "Render cache evictions.", lambda: render_cache.evictions, kind="counter")
+register_callback("render_cache_bytes", "Size of the render cache on disk.", lambda: render_cache.stats()["bytes"])
+register_callback("render_batches_in_flight", "Batches with items still queued or rendering.", lambda: batch_manager.in_flight())
+
+
+@app.on_event("shutdown")
+async def shutdown_job_manager():
+    job_manager.shutdown()
+    shutdown_pool()
+    await close_async_client()
+
 
 @app.get("/health")
 async def health_check():
@@ -43,43 +97,290 @@ async def health_check():
     return {
         "status": "ok",
         "service": "AI Product Video Generator 3D",
-        "features": ["3D perspective", "camera zoom", "camera pan", "motion blur"]
+        "features": ["3D perspective", "camera zoom", "camera pan", "motion blur"],
+        "jobs": job_manager.stats(),
+        "cache": render_cache.stats()
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: hot-path stage timings, job queue and cache."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/effects")
 async def get_available_effects():
-    """Get available 3D effects."""
+    """Get available 3D effects with their parameters and measured cost."""
+    registered = list_effects()
+    costs = effect_costs()
     return {
         "available_effects": DEFAULT_3D_EFFECTS,
-        "description": {
-            "zoom": "Camera zoom/dolly effect - moves forward and backward",
-            "pan": "Camera pan effect - moves left/right/up/down",
-            "rotation": "Full 3D rotation - spins the image",
-            "perspective": "3D perspective tilt - tilts in 3D space",
-            "depth_of_field": "Depth of field - focus blur effect",
-            "motion_blur": "Cinematic motion blur - smooths motion",
-            "chromatic_aberration": "RGB channel separation - sci-fi effect"
-        }
+        "description": {effect.name: effect.description for effect in registered},
+        "effects": [
+            {**effect.to_dict(), "measured": costs.get(effect.name)}
+            for effect in registered
+        ],
+        "stages": stage_costs()
     }
 
 
+@app.get("/profiles")
+async def get_render_profiles():
+    """Get the allowed render profile options (quality, aspect ratio, fps, duration) and encoder profiles."""
+    return {**profile_options(), "encoding": encode_options()}
+
+
+def _render_profile(quality: str | None, aspect_ratio: str | None, fps: int | None, duration: float | None) -> RenderProfile:
+    """Validate the request's render profile options."""
+    try:
+        return parse_render_profile(quality, aspect_ratio, fps, duration)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _encode_profile(encode: str | None, codec: str | None, tune: str | None) -> EncodeProfile:
+    """Validate the request's encoder options."""
+    try:
+        return parse_encode_profile(encode, codec, tune)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _validate_effects(custom_effects: dict | None) -> dict:
+    """Merge effect settings over the defaults and validate them."""
+    video_effects = DEFAULT_3D_EFFECTS.copy()
+    if custom_effects:
+        if not isinstance(custom_effects, dict):
+            raise HTTPException(status_code=400, detail="Effect settings must be a JSON object")
+        video_effects.update(custom_effects)
+    
+    try:
+        resolve_effects(video_effects)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return video_effects
+
+
+def _parse_effects(effects: str | None) -> dict:
+    """Merge the request's effect JSON over the defaults and validate it."""
+    custom_effects = None
+    if effects:
+        try:
+            custom_effects = json.loads(effects)
+            logger.info(f"Applied custom effects: {custom_effects}")
+        except json.JSONDecodeError:
+            logger.warning(f"Invalid effects JSON, using defaults")
+    return _validate_effects(custom_effects)
+
+
+def _parse_segment_effects(effects: str | None, segments: int) -> list[dict]:
+    """
+    Effect settings for each transition of a sequence.
+    
+    Accepts one JSON object used for every transition, or a list with one
+    object per transition.
+    """
+    if not effects:
+        return [_validate_effects(None)] * segments
+    try:
+        parsed = json.loads(effects)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid effects JSON")
+    if isinstance(parsed, list):
+        if len(parsed) != segments:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Expected effects for {segments} transitions, got {len(parsed)}"
+            )
+        return [_validate_effects(custom) for custom in parsed]
+    return [_validate_effects(parsed)] * segments
+
+
+async def _save_uploads(job_id: str, initial_image: UploadFile, final_image: UploadFile):
+    """
+    Validate and save both uploads for a job.
+    
+    Returns:
+        (img1_path, img2_path, upload1, upload2)
+    """
+    # Validate image types
+    if initial_image.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid initial image type. Allowed: {ALLOWED_IMAGE_TYPES}"
+        )
+    
+    if final_image.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid final image type. Allowed: {ALLOWED_IMAGE_TYPES}"
+        )
+    
+    img1_path = UPLOAD_DIR / f"{job_id}_start.jpg"
+    img2_path = UPLOAD_DIR / f"{job_id}_end.jpg"
+    
+    logger.info(f"Saving uploaded images for job {job_id}")
+    try:
+        upload1 = await save_upload_file(initial_image, img1_path)
+        upload2 = await save_upload_file(final_image, img2_path)
+        logger.info(
+            f"Job {job_id} images: {upload1.width}x{upload1.height} {upload1.format}, "
+            f"{upload2.width}x{upload2.height} {upload2.format}"
+        )
+    except Exception:
+        cleanup_files(img1_path, img2_path)
+        raise
+    return img1_path, img2_path, upload1, upload2
+
+
+def _playlist_url(job) -> str | None:
+    return f"/jobs/{job.id}/live/index.m3u8" if job.live_dir is not None else None
+
+
+async def _start_render_job(
+    job_id: str,
+    initial_image: UploadFile,
+    final_image: UploadFile,
+    effects: str | None,
+    provider: str | None,
+    prompt: str | None,
+    profile: RenderProfile,
+    encoding: EncodeProfile,
+    live: bool = False
+):
+    """
+    Validate and save the uploads, then serve the render from cache or queue it.
+    
+    Returns:
+        The Job (already finished on a cache hit)
+    """
+    video_effects = _parse_effects(effects)
+    img1_path, img2_path, upload1, upload2 = await _save_uploads(job_id, initial_image, final_image)
+    try:
+        return _submit_render(
+            job_id, img1_path, img2_path, upload1, upload2, video_effects, provider, prompt, profile, encoding,
+            live=live
+        )
+    except QueueFullError as e:
+        logger.warning(f"Rejecting job {job_id}: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+
+def _submit_render(
+    job_id: str,
+    img1_path: Path,
+    img2_path: Path,
+    upload1: SavedUpload,
+    upload2: SavedUpload,
+    video_effects: dict,
+    provider: str | None,
+    prompt: str | None,
+    profile: RenderProfile,
+    encoding: EncodeProfile = DEFAULT_ENCODE_PROFILE,
+    keep_inputs: bool = False,
+    live: bool = False
+):
+    """
+    Serve a render from cache or queue it.
+    
+    The job takes ownership of the saved uploads and deletes them when
+    done, unless keep_inputs is set (batch images shared between items).
+    With live set, a local render also writes an HLS playlist while it
+    runs (see GET /jobs/{job_id}/live/index.m3u8).
+    
+    Returns:
+        The Job (already finished on a cache hit)
+    
+    Raises:
+        QueueFullError: If the render queue is full (the uploads are deleted)
+    """
+    temp_frames = OUTPUT_DIR / f"{job_id}_frames"
+    output_video = OUTPUT_DIR / f"{job_id}.mp4"
+    live_dir = OUTPUT_DIR / f"{job_id}_live" if live and not provider else None
+    
+    def cleanup(job=None):
+        # Cleanup temporary files
+        logger.info(f"Cleaning up temporary files for job {job_id}")
+        if keep_inputs:
+            cleanup_files(temp_frames)
+        else:
+            cleanup_files(img1_path, img2_path, temp_frames)
+    
+    cache_key = make_cache_key(upload1.sha256, upload2.sha256, video_effects, provider, prompt, profile, encoding)
+    cached = render_cache.get(cache_key, output_video)
+    if cached:
+        logger.info(f"Serving job {job_id} from render cache ({cache_key[:12]})")
+        cleanup()
+        return job_manager.add_finished(cached, job_id=job_id)
+    
+    def store(video_path):
+        try:
+            render_cache.put(cache_key, video_path)
+        except OSError as e:
+            logger.warning(f"Could not cache render for job {job_id}: {e}")
+        return video_path
+    
+    async def render_with_provider():
+        # External providers mostly wait on the network: run on the event loop
+        logger.info(f"Generating video using external provider={provider} prompt={'present' if prompt else 'none'} for job {job_id}")
+        video_path = await call_provider_async(provider, prompt, img1_path, img2_path, output_video)
+        return await asyncio.to_thread(store, video_path)
+    
+    def render():
+        # Generate video locally with 3D effects
+        logger.info(
+            f"Generating 3D video with effects: {list(video_effects.keys())} "
+            f"at {profile.width}x{profile.height} {profile.fps}fps x {profile.frame_count} frames "
+            f"({encoding.name}, {encoding.codec}) for job {job_id}"
+        )
+        video_path = process_images_to_video(
+            img1_path, img2_path, temp_frames, output_video,
+            effects=video_effects, profile=profile, encoding=encoding, live_dir=live_dir,
+            hashes=(upload1.sha256, upload2.sha256)
+        )
+        return store(video_path)
+    
+    try:
+        if provider:
+            return job_manager.submit_async(render_with_provider, job_id=job_id, on_finish=cleanup)
+        return job_manager.submit(render, job_id=job_id, on_finish=cleanup, live_dir=live_dir)
+    except QueueFullError:
+        cleanup()
+        raise
+
+
 @app.post("/generate-video")
 async def generate_video(
     initial_image: UploadFile = File(...),
     final_image: UploadFile = File(...),
     effects: str = Query(None, description="JSON string with effect settings"),
     provider: str = Query(None, description="Optional external provider: openai, runway, luma, pika, or external"),
-    prompt: str = Query(None, description="Optional text prompt to guide external image->video generation")
+    prompt: str = Query(None, description="Optional text prompt to guide external image->video generation"),
+    quality: str = Query(None, description="Output quality: 480p, 720p or 1080p (short side)"),
+    aspect_ratio: str = Query(None, description="Output aspect ratio: 1:1, 9:16 or 16:9"),
+    fps: int = Query(None, description="Frames per second (12-60)"),
+    duration: float = Query(None, description="Video length in seconds"),
+    encode: str = Query(None, description="Encoder profile: fast-preview, balanced or archive"),
+    codec: str = Query(None, description="Video codec: h264 (default), or hevc, vp9, av1 where supported"),
+    tune: str = Query(None, description="Encoder tune, e.g. stillimage or animation (h264/hevc)")
 ):
     """
     Generate a cinematic 3D transition video between two product images.
     
+    The render runs on the job worker pool; this request waits for it
+    without blocking the event loop. Use POST /jobs to get a job id back
+    immediately instead.
+    
     Args:
         initial_image: Initial product image (jpg/png)
         final_image: Final product image (jpg/png)
         effects: Optional JSON string with effect settings
                 Example: {"zoom": true, "pan": true, "rotation": false}
+        quality, aspect_ratio, fps, duration: Optional render profile
+                (see GET /profiles); defaults to 1080x1080, 24 fps, 5 seconds
+        encode, codec, tune: Optional encoder settings (see GET /profiles);
+                defaults to the balanced H.264 profile
     
     Returns:
         MP4 video file with 3D effects and camera movements
@@ -87,56 +388,12 @@ async def generate_video(
     job_id = uuid.uuid4().hex
     logger.info(f"Processing 3D video generation job: {job_id}")
     
+    profile = _render_profile(quality, aspect_ratio, fps, duration)
+    encoding = _encode_profile(encode, codec, tune)
+    
     try:
-        # Validate image types
-        if initial_image.content_type not in ALLOWED_IMAGE_TYPES:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid initial image type. Allowed: {ALLOWED_IMAGE_TYPES}"
-            )
-        
-        if final_image.content_type not in ALLOWED_IMAGE_TYPES:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid final image type. Allowed: {ALLOWED_IMAGE_TYPES}"
-            )
-        
-        # Parse effects from query parameter
-        video_effects = DEFAULT_3D_EFFECTS.copy()
-        if effects:
-            try:
-                custom_effects = json.loads(effects)
-                video_effects.update(custom_effects)
-                logger.info(f"Applied custom effects: {custom_effects}")
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid effects JSON, using defaults")
-        
-        # Define paths
-        img1_path = UPLOAD_DIR / f"{job_id}_start.jpg"
-        img2_path = UPLOAD_DIR / f"{job_id}_end.jpg"
-        temp_frames = OUTPUT_DIR / f"{job_id}_frames"
-        output_video = OUTPUT_DIR / f"{job_id}.mp4"
-        
-        # Create frame directory
-        create_directories(temp_frames)
-        
-        # Save uploaded files
-        logger.info(f"Saving uploaded images for job {job_id}")
-        await save_upload_file(initial_image, img1_path)
-        await save_upload_file(final_image, img2_path)
-        
-        # If an external provider is requested, delegate generation
-        if provider:
-            logger.info(f"Generating video using external provider={provider} prompt={'present' if prompt else 'none'} for job {job_id}")
-            video_path = process_images_to_video(
-                img1_path, img2_path, temp_frames, output_video, effects=video_effects, provider=provider, prompt=prompt
-            )
-        else:
-            # Generate video locally with 3D effects
-            logger.info(f"Generating 3D video with effects: {list(video_effects.keys())} for job {job_id}")
-            video_path = process_images_to_video(
-                img1_path, img2_path, temp_frames, output_video, effects=video_effects
-            )
+        job = await _start_render_job(job_id, initial_image, final_image, effects, provider, prompt, profile, encoding)
+        video_path = await asyncio.wrap_future(job.future)
         
         logger.info(f"3D Video generation completed for job {job_id}")
         
@@ -152,14 +409,325 @@ async def generate_video(
     except Exception as e:
         logger.error(f"Error processing job {job_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Video generation failed: {str(e)}")
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    initial_image: UploadFile = File(...),
+    final_image: UploadFile = File(...),
+    effects: str = Query(None, description="JSON string with effect settings"),
+    provider: str = Query(None, description="Optional external provider: openai, runway, luma, pika, or external"),
+    prompt: str = Query(None, description="Optional text prompt to guide external image->video generation"),
+    quality: str = Query(None, description="Output quality: 480p, 720p or 1080p (short side)"),
+    aspect_ratio: str = Query(None, description="Output aspect ratio: 1:1, 9:16 or 16:9"),
+    fps: int = Query(None, description="Frames per second (12-60)"),
+    duration: float = Query(None, description="Video length in seconds"),
+    encode: str = Query(None, description="Encoder profile: fast-preview, balanced or archive"),
+    codec: str = Query(None, description="Video codec: h264 (default), or hevc, vp9, av1 where supported"),
+    tune: str = Query(None, description="Encoder tune, e.g. stillimage or animation (h264/hevc)"),
+    live: bool = Query(False, description="Also stream the render as HLS while it runs (local renders)")
+):
+    """
+    Queue a 3D transition video render and return its job id right away.
     
-    finally:
-        # Cleanup temporary files
+    Poll GET /jobs/{job_id} for status and fetch the result from
+    GET /jobs/{job_id}/video. Returns 503 when the render queue is full.
+    With live=true, playlist_url is an HLS playlist that can be played
+    while later frames are still rendering (null on a cache hit, where
+    the video is ready at once).
+    """
+    job_id = uuid.uuid4().hex
+    logger.info(f"Queueing 3D video generation job: {job_id}")
+    
+    profile = _render_profile(quality, aspect_ratio, fps, duration)
+    encoding = _encode_profile(encode, codec, tune)
+    if live and provider:
+        raise HTTPException(status_code=400, detail="live is only supported for local renders")
+    job = await _start_render_job(
+        job_id, initial_image, final_image, effects, provider, prompt, profile, encoding, live=live
+    )
+    
+    return {
+        **job.to_dict(),
+        "profile": profile.to_dict(),
+        "encoding": encoding.to_dict(),
+        "status_url": f"/jobs/{job_id}",
+        "video_url": f"/jobs/{job_id}/video",
+        "playlist_url": _playlist_url(job),
+    }
+
+
+@app.post("/preview")
+async def preview_video(
+    initial_image: UploadFile = File(...),
+    final_image: UploadFile = File(...),
+    effects: str = Query(None, description="JSON string with effect settings"),
+    quality: str = Query(None, description="Output quality of the full render: 480p, 720p or 1080p"),
+    aspect_ratio: str = Query(None, description="Output aspect ratio: 1:1, 9:16 or 16:9"),
+    fps: int = Query(None, description="Frames per second of the full render (12-60)"),
+    duration: float = Query(None, description="Video length in seconds"),
+    preview_format: str = Query("webp", alias="format", description="Preview format: webp, gif or mp4"),
+    full_render: bool = Query(False, description="Also queue the full-quality render in the background"),
+    encode: str = Query(None, description="Encoder profile of the full render: fast-preview, balanced or archive"),
+    codec: str = Query(None, description="Video codec of the full render: h264 (default), or hevc, vp9, av1 where supported"),
+    tune: str = Query(None, description="Encoder tune of the full render, e.g. stillimage or animation (h264/hevc)")
+):
+    """
+    Render a quick low-resolution preview of a transition.
+    
+    The preview runs the same effect pipeline as the full video at a
+    small proxy size and frame rate, and is returned directly. With
+    full_render=true the full render is queued afterwards from the same
+    uploads; its job id and URLs come back in the X-Job-Id,
+    X-Job-Status-Url and X-Job-Video-Url headers (X-Job-Error if it
+    could not be queued). Returns 503 when the preview queue is full.
+    """
+    if preview_format not in PREVIEW_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid preview format. Allowed: {list(PREVIEW_FORMATS)}")
+    
+    profile = _render_profile(quality, aspect_ratio, fps, duration)
+    encoding = _encode_profile(encode, codec, tune)
+    video_effects = _parse_effects(effects)
+    
+    job_id = uuid.uuid4().hex
+    img1_path, img2_path, upload1, upload2 = await _save_uploads(job_id, initial_image, final_image)
+    
+    proxy = preview_profile(profile)
+    logger.info(f"Rendering {proxy.width}x{proxy.height} x {proxy.frame_count} frame {preview_format} preview for job {job_id}")
+    try:
+        future = job_manager.submit_preview(
+            partial(
+                render_preview, img1_path, img2_path, video_effects, profile, preview_format,
+                hashes=(upload1.sha256, upload2.sha256)
+            )
+        )
+    except QueueFullError as e:
+        cleanup_files(img1_path, img2_path)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    try:
+        content = await asyncio.wrap_future(future)
+    except Exception as e:
+        cleanup_files(img1_path, img2_path)
+        logger.error(f"Error rendering preview for job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Preview generation failed: {str(e)}")
+    
+    headers = {}
+    if full_render:
+        try:
+            job = _submit_render(
+                job_id, img1_path, img2_path, upload1, upload2, video_effects, None, None, profile, encoding
+            )
+            headers = {
+                "X-Job-Id": job.id,
+                "X-Job-Status-Url": f"/jobs/{job.id}",
+                "X-Job-Video-Url": f"/jobs/{job.id}/video",
+            }
+        except QueueFullError as e:
+            # Still return the preview; the client can retry the full render
+            headers = {"X-Job-Error": str(e)}
+    else:
+        cleanup_files(img1_path, img2_path)
+    
+    return Response(content=content, media_type=PREVIEW_FORMATS[preview_format], headers=headers)
+
+
+@app.post("/sequences", status_code=202)
+async def create_sequence_job(
+    images: list[UploadFile] = File(..., description="Two or more product images, in order"),
+    effects: str = Query(None, description="JSON effect settings: one object for every transition, or a list with one per transition"),
+    quality: str = Query(None, description="Output quality: 480p, 720p or 1080p (short side)"),
+    aspect_ratio: str = Query(None, description="Output aspect ratio: 1:1, 9:16 or 16:9"),
+    fps: int = Query(None, description="Frames per second (12-60)"),
+    duration: float = Query(None, description="Length of each transition in seconds"),
+    encode: str = Query(None, description="Encoder profile: fast-preview, balanced or archive"),
+    codec: str = Query(None, description="Video codec: h264 (default), or hevc, vp9, av1 where supported"),
+    tune: str = Query(None, description="Encoder tune, e.g. stillimage or animation (h264/hevc)"),
+    live: bool = Query(False, description="Also stream the render as HLS while it runs")
+):
+    """
+    Queue one video moving through all images (A -> B -> C ...).
+    
+    Every transition is rendered into the same encoder in a single pass,
+    and each image is decoded once. Poll GET /jobs/{job_id} and fetch the
+    result from GET /jobs/{job_id}/video, or with live=true play
+    playlist_url while it renders.
+    """
+    if not 2 <= len(images) <= MAX_SEQUENCE_IMAGES:
+        raise HTTPException(status_code=400, detail=f"A sequence needs 2 to {MAX_SEQUENCE_IMAGES} images")
+    for upload in images:
+        if upload.content_type not in ALLOWED_IMAGE_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid image type for {upload.filename!r}. Allowed: {ALLOWED_IMAGE_TYPES}"
+            )
+    
+    profile = _render_profile(quality, aspect_ratio, fps, duration)
+    encoding = _encode_profile(encode, codec, tune)
+    segment_effects = _parse_segment_effects(effects, len(images) - 1)
+    
+    job_id = uuid.uuid4().hex
+    paths = [UPLOAD_DIR / f"{job_id}_{i:02d}.jpg" for i in range(len(images))]
+    output_video = OUTPUT_DIR / f"{job_id}.mp4"
+    live_dir = OUTPUT_DIR / f"{job_id}_live" if live else None
+    
+    def cleanup(job=None):
         logger.info(f"Cleaning up temporary files for job {job_id}")
+        cleanup_files(*paths)
+    
+    logger.info(f"Saving {len(images)} sequence images for job {job_id}")
+    try:
+        uploads = [await save_upload_file(upload, path) for upload, path in zip(images, paths)]
+    except Exception:
+        cleanup()
+        raise
+    
+    cache_key = make_sequence_cache_key([upload.sha256 for upload in uploads], segment_effects, profile, encoding)
+    cached = render_cache.get(cache_key, output_video)
+    if cached:
+        logger.info(f"Serving job {job_id} from render cache ({cache_key[:12]})")
+        cleanup()
+        job = job_manager.add_finished(cached, job_id=job_id)
+    else:
+        def render():
+            logger.info(
+                f"Generating {len(paths) - 1}-transition sequence at {profile.width}x{profile.height} "
+                f"{profile.fps}fps for job {job_id}"
+            )
+            video_path = process_sequence_to_video(
+                paths, output_video, segment_effects, profile, encoding, live_dir=live_dir,
+                hashes=[upload.sha256 for upload in uploads]
+            )
+            try:
+                render_cache.put(cache_key, video_path)
+            except OSError as e:
+                logger.warning(f"Could not cache render for job {job_id}: {e}")
+            return video_path
+        
         try:
-            cleanup_files(img1_path, img2_path, temp_frames)
-        except Exception as e:
-            logger.warning(f"Error during cleanup for job {job_id}: {str(e)}")
+            job = job_manager.submit(render, job_id=job_id, on_finish=cleanup, live_dir=live_dir)
+        except QueueFullError as e:
+            cleanup()
+            logger.warning(f"Rejecting job {job_id}: {e}")
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    
+    return {
+        **job.to_dict(),
+        "profile": profile.to_dict(),
+        "encoding": encoding.to_dict(),
+        "transitions": len(images) - 1,
+        "status_url": f"/jobs/{job_id}",
+        "video_url": f"/jobs/{job_id}/video",
+        "playlist_url": _playlist_url(job),
+    }
+
+
+def _submit_batch_item(item: BatchItem):
+    return _submit_render(
+        uuid.uuid4().hex, item.initial.path, item.final.path, item.initial, item.final,
+        item.effects, None, None, item.profile, item.encoding, keep_inputs=True
+    )
+
+
+@app.post("/batches", status_code=202)
+async def create_batch(
+    manifest: UploadFile = File(..., description="CSV or JSONL manifest, or a zip with a manifest and its images"),
+    images: list[UploadFile] = File(None, description="Images referenced by name from a CSV/JSONL manifest"),
+    effects: str = Query(None, description="JSON effect settings for every item; per-item effects override them")
+):
+    """
+    Queue a transition video for every item of a manifest.
+    
+    Manifest rows have initial_image and final_image (file names inside
+    the zip or of the uploaded images) and optionally id, effects (JSON),
+    quality, aspect_ratio, fps, duration, encode, codec and tune. Poll GET /batches/{batch_id}
+    for progress; each finished item has a video_url.
+    """
+    if manifest.size is not None and manifest.size > MAX_BATCH_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch upload exceeds {MAX_BATCH_UPLOAD_SIZE} bytes")
+    
+    default_effects = _parse_effects(effects)
+    batch_id = uuid.uuid4().hex
+    workdir = UPLOAD_DIR / f"batch_{batch_id}"
+    logger.info(f"Loading batch {batch_id} from {manifest.filename}")
+    
+    try:
+        items = await load_batch(manifest, images or [], workdir, default_effects)
+    except ValueError as e:
+        cleanup_files(workdir)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        cleanup_files(workdir)
+        raise
+    
+    batch = batch_manager.start(batch_id, items, workdir, _submit_batch_item)
+    
+    return {
+        **batch.to_dict(include_items=False),
+        "status_url": f"/batches/{batch_id}",
+    }
+
+
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str, items: bool = Query(True, description="Include per-item results")):
+    """Get aggregate progress and per-item results of a batch."""
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict(include_items=items)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of a render job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.api_route("/jobs/{job_id}/video", methods=["GET", "HEAD"])
+async def get_job_video(
+    job_id: str,
+    request: Request,
+    download: bool = Query(False, description="Send as an attachment instead of inline")
+):
+    """
+    Stream the video of a finished render job.
+    
+    Supports byte ranges (206) for seeking and progressive playback, and
+    conditional requests against a strong ETag (the video's SHA-256) or
+    Last-Modified, answered with 304.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=f"Video generation failed: {job.error}")
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    
+    return await video_response(request, job.output_path, download=download)
+
+
+@app.get("/jobs/{job_id}/live/{name}")
+async def get_job_live_file(job_id: str, name: str):
+    """
+    Serve the live HLS output of a job started with live=true.
+    
+    index.m3u8 is an EVENT playlist of fMP4 segments that grows while the
+    job renders and ends with EXT-X-ENDLIST once it is done. Until the
+    first segment is encoded this returns 404 with Retry-After.
+    """
+    job = job_manager.get(job_id)
+    if job is None or job.live_dir is None:
+        raise HTTPException(status_code=404, detail="Live output not found")
+    
+    response = live_file_response(job.live_dir, name)
+    if response is None:
+        if job.status in (QUEUED, RUNNING):
+            raise HTTPException(status_code=404, detail="Live output not ready yet", headers={"Retry-After": "1"})
+        raise HTTPException(status_code=404, detail="Live output not found")
+    return response
 
 
 if __name__ == "__main__":
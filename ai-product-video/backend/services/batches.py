@@ -0,0 +1,360 @@
+"""Batch renders for whole catalogs.
+
+A batch is one upload describing many transitions: a CSV or JSONL
+manifest plus its images, or a zip archive holding both. Each manifest
+row names an initial and a final image and may carry its own effects and
+render profile and encoder settings:
+
+    id,initial_image,final_image,effects,quality,aspect_ratio,fps,duration,encode,codec
+    sku-1,front.jpg,back.jpg,"{""rotation"": true}",720p,9:16,,,archive,
+    sku-2,front.jpg,side.jpg,,,,,,,
+
+Images are stored once per content hash, so an image shared by several
+rows is saved once and, through services.image_loader's cache, decoded
+once. Items are handed to the render job pool by a feeder thread that
+keeps at most BATCH_QUEUE_DEPTH jobs waiting ahead of the workers, so a
+large batch keeps every worker busy without taking the queue slots
+interactive requests rely on. Items that share images are scheduled next
+to each other so their decodes hit the cache.
+"""
+from concurrent import futures
+from dataclasses import dataclass, field, replace
+from pathlib import Path, PurePosixPath
+from typing import Callable
+import csv
+import io
+import json
+import logging
+import threading
+import time
+import zipfile
+
+from fastapi import UploadFile
+
+from config import BATCH_QUEUE_DEPTH, DEFAULT_3D_EFFECTS, JOB_RESULT_TTL, MAX_BATCH_ITEMS
+from services.effect_registry import resolve_effects
+from services.encode_profile import EncodeProfile, parse_encode_profile
+from services.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, Job, JobManager, QueueFullError
+from services.render_profile import RenderProfile, parse_render_profile
+from utils.file_manager import SavedUpload, cleanup_files, save_upload_file
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+
+MANIFEST_SUFFIXES = (".csv", ".jsonl", ".ndjson")
+MAX_MANIFEST_SIZE = 16 * 1024 * 1024
+BATCH_IMAGE_FORMATS = {"JPEG", "PNG"}
+
+
+@dataclass
+class BatchItem:
+    index: int
+    name: str
+    initial_image: str
+    final_image: str
+    effects: dict
+    profile: RenderProfile
+    encoding: EncodeProfile
+    initial: SavedUpload | None = None
+    final: SavedUpload | None = None
+    job: Job | None = field(default=None, repr=False)
+    error: str | None = None
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return FAILED
+        if self.job is None:
+            return PENDING
+        return self.job.status
+
+    def to_dict(self) -> dict:
+        status = self.status
+        return {
+            "index": self.index,
+            "id": self.name,
+            "status": status,
+            "job_id": self.job.id if self.job else None,
+            "error": self.error or (self.job.error if self.job else None),
+            "video_url": f"/jobs/{self.job.id}/video" if status == SUCCEEDED else None,
+        }
+
+
+@dataclass
+class Batch:
+    id: str
+    items: list[BatchItem]
+    workdir: Path
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    def to_dict(self, include_items: bool = True) -> dict:
+        counts = {PENDING: 0, QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        total = len(self.items)
+        done = counts[SUCCEEDED] + counts[FAILED]
+        result = {
+            "batch_id": self.id,
+            "status": "finished" if self.finished_at is not None else "running",
+            "total": total,
+            "counts": counts,
+            "progress": round(done / total, 4) if total else 1.0,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if include_items:
+            result["items"] = [item.to_dict() for item in self.items]
+        return result
+
+
+def _clean(value) -> str | None:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def parse_manifest(text: str, filename: str) -> list[dict]:
+    """
+    Parse a CSV or JSONL manifest into rows.
+
+    Raises:
+        ValueError: If the manifest is malformed
+    """
+    if PurePosixPath(filename).suffix.lower() == ".csv":
+        reader = csv.DictReader(io.StringIO(text))
+        rows = [{k.strip(): v for k, v in row.items() if k} for row in reader]
+    else:
+        rows = []
+        for line_no, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Manifest line {line_no}: invalid JSON ({e.msg})")
+            if not isinstance(row, dict):
+                raise ValueError(f"Manifest line {line_no}: expected a JSON object")
+            rows.append(row)
+
+    if not rows:
+        raise ValueError("Manifest has no items")
+    if len(rows) > MAX_BATCH_ITEMS:
+        raise ValueError(f"Manifest has {len(rows)} items; at most {MAX_BATCH_ITEMS} allowed")
+    return rows
+
+
+def build_items(rows: list[dict], default_effects: dict) -> list[BatchItem]:
+    """
+    Validate manifest rows into batch items.
+
+    Per-item effects are merged over default_effects; profile and encoder
+    columns left empty use the defaults.
+
+    Raises:
+        ValueError: Naming the first invalid row
+    """
+    items = []
+    for index, row in enumerate(rows):
+        try:
+            initial, final = _clean(row.get("initial_image")), _clean(row.get("final_image"))
+            if not initial or not final:
+                raise ValueError("initial_image and final_image are required")
+
+            effects = {**DEFAULT_3D_EFFECTS, **default_effects}
+            custom = row.get("effects")
+            if isinstance(custom, str) and custom.strip():
+                custom = json.loads(custom)
+            if custom:
+                if not isinstance(custom, dict):
+                    raise ValueError("effects must be a JSON object")
+                effects.update(custom)
+            resolve_effects(effects)
+
+            fps, duration = _clean(row.get("fps")), _clean(row.get("duration"))
+            profile = parse_render_profile(
+                _clean(row.get("quality")),
+                _clean(row.get("aspect_ratio")),
+                int(fps) if fps is not None else None,
+                float(duration) if duration is not None else None,
+            )
+            encoding = parse_encode_profile(
+                _clean(row.get("encode")), _clean(row.get("codec")), _clean(row.get("tune"))
+            )
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Manifest item {index}: {e}")
+
+        items.append(BatchItem(
+            index=index,
+            name=_clean(row.get("id")) or str(index),
+            initial_image=initial,
+            final_image=final,
+            effects=effects,
+            profile=profile,
+            encoding=encoding,
+        ))
+    return items
+
+
+async def _store_image(upload: UploadFile, workdir: Path, seq: int) -> SavedUpload:
+    """Save an image under its content hash; identical images share one file."""
+    temp = workdir / f"upload_{seq}.part"
+    saved = await save_upload_file(upload, temp)
+    if saved.format not in BATCH_IMAGE_FORMATS:
+        temp.unlink(missing_ok=True)
+        raise ValueError(f"Image {upload.filename!r} is {saved.format}; allowed: {sorted(BATCH_IMAGE_FORMATS)}")
+    destination = workdir / f"{saved.sha256}.{saved.format.lower()}"
+    if destination.exists():
+        temp.unlink()
+    else:
+        temp.rename(destination)
+    return replace(saved, path=destination)
+
+
+async def load_batch(
+    manifest: UploadFile,
+    images: list[UploadFile],
+    workdir: Path,
+    default_effects: dict
+) -> list[BatchItem]:
+    """
+    Read a batch upload and store the images it references in workdir.
+
+    Args:
+        manifest: CSV/JSONL manifest, or a zip holding a manifest and the images
+        images: Image uploads referenced by name from a CSV/JSONL manifest
+        workdir: Directory for the batch's images
+        default_effects: Effect settings items are merged over
+
+    Returns:
+        Validated items with their images saved
+
+    Raises:
+        ValueError: If the manifest is invalid or references missing images
+    """
+    workdir.mkdir(parents=True, exist_ok=True)
+    manifest.file.seek(0)
+    archive = zipfile.ZipFile(manifest.file) if zipfile.is_zipfile(manifest.file) else None
+
+    if archive is not None:
+        names = [n for n in archive.namelist() if PurePosixPath(n).suffix.lower() in MANIFEST_SUFFIXES]
+        if not names:
+            raise ValueError(f"Zip archive has no manifest ({', '.join(MANIFEST_SUFFIXES)})")
+        # Prefer a manifest at the top level
+        manifest_name = min(names, key=lambda n: (n.count("/"), n))
+        if archive.getinfo(manifest_name).file_size > MAX_MANIFEST_SIZE:
+            raise ValueError(f"Manifest exceeds {MAX_MANIFEST_SIZE} bytes")
+        text = archive.read(manifest_name).decode("utf-8-sig")
+        base = PurePosixPath(manifest_name).parent
+        available = set(archive.namelist())
+
+        def open_image(name: str) -> UploadFile | None:
+            member = str(base / name) if str(base) != "." else name
+            if member not in available:
+                return None
+            return UploadFile(archive.open(member), filename=name)
+    else:
+        manifest.file.seek(0)
+        data = await manifest.read(MAX_MANIFEST_SIZE + 1)
+        if len(data) > MAX_MANIFEST_SIZE:
+            raise ValueError(f"Manifest exceeds {MAX_MANIFEST_SIZE} bytes")
+        text = data.decode("utf-8-sig")
+        manifest_name = manifest.filename or "manifest.csv"
+        by_name = {PurePosixPath(upload.filename or "").name: upload for upload in images}
+
+        def open_image(name: str) -> UploadFile | None:
+            upload = by_name.get(PurePosixPath(name).name)
+            if upload is not None:
+                upload.file.seek(0)
+            return upload
+
+    items = build_items(parse_manifest(text, manifest_name), default_effects)
+
+    saved: dict[str, SavedUpload] = {}
+    for item in items:
+        for name in (item.initial_image, item.final_image):
+            if name in saved:
+                continue
+            upload = open_image(name)
+            if upload is None:
+                raise ValueError(f"Manifest item {item.index}: image {name!r} not found in the upload")
+            saved[name] = await _store_image(upload, workdir, len(saved))
+        item.initial = saved[item.initial_image]
+        item.final = saved[item.final_image]
+
+    logger.info(f"Batch in {workdir.name}: {len(items)} items, {len({s.sha256 for s in saved.values()})} distinct images")
+    return items
+
+
+class BatchManager:
+    """Feeds batch items into the render job pool and tracks their progress."""
+
+    def __init__(self, job_manager: JobManager, queue_depth: int = BATCH_QUEUE_DEPTH, result_ttl: float = JOB_RESULT_TTL):
+        self.job_manager = job_manager
+        self.queue_depth = max(1, min(queue_depth, job_manager.max_queued))
+        self.result_ttl = result_ttl
+        self._batches: dict[str, Batch] = {}
+        self._lock = threading.Lock()
+
+    def start(self, batch_id: str, items: list[BatchItem], workdir: Path, submit: Callable[[BatchItem], Job]) -> Batch:
+        """
+        Register a batch and start feeding its items to the job pool.
+
+        Args:
+            batch_id: Id of the batch
+            items: Validated items with saved images
+            workdir: Directory holding the batch's images (deleted when the batch finishes)
+            submit: Queues one item, returning its Job; raises QueueFullError if the queue is full
+        """
+        batch = Batch(id=batch_id, items=items, workdir=workdir)
+        with self._lock:
+            self._prune()
+            self._batches[batch.id] = batch
+        threading.Thread(
+            target=self._feed, args=(batch, submit), name=f"batch-{batch_id[:8]}", daemon=True
+        ).start()
+        return batch
+
+    def get(self, batch_id: str) -> Batch | None:
+        return self._batches.get(batch_id)
+
+    def in_flight(self) -> int:
+        return sum(1 for b in self._batches.values() if b.finished_at is None)
+
+    def _feed(self, batch: Batch, submit: Callable[[BatchItem], Job]) -> None:
+        limit = self.job_manager.workers + self.queue_depth
+        pending = []
+        # Neighbouring items share decoded sources in the image cache
+        order = sorted(batch.items, key=lambda i: (i.profile.size, i.initial.sha256, i.final.sha256))
+        try:
+            for item in order:
+                while True:
+                    self.job_manager.wait_for_capacity(limit)
+                    try:
+                        item.job = submit(item)
+                        break
+                    except QueueFullError:
+                        # Interactive requests took the free slots; wait for the next one
+                        continue
+                    except Exception as e:
+                        logger.error(f"Batch {batch.id} item {item.index} could not be queued: {e}")
+                        item.error = getattr(e, "detail", None) or str(e)
+                        break
+                if item.job is not None:
+                    pending.append(item.job.future)
+            futures.wait(pending)
+        finally:
+            batch.finished_at = time.time()
+            cleanup_files(batch.workdir)
+            logger.info(f"Batch {batch.id} finished: {batch.to_dict(include_items=False)['counts']}")
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            batch_id for batch_id, b in self._batches.items()
+            if b.finished_at is not None and b.finished_at < cutoff
+        ]
+        for batch_id in expired:
+            del self._batches[batch_id]
@@ -0,0 +1,107 @@
+"""Chromatic aberration.
+
+Two looks:
+
+    shift   Channels 0 and 2 slide sideways in opposite directions by an
+            integer number of pixels that pulses with the animation.
+    radial  Lens-style lateral aberration: channel 0 is magnified and
+            channel 2 shrunk about the frame centre, by nothing at the
+            centre up to `max_shift` pixels in the corners.
+
+An integer shift is a strided slice copy, so the shift look copies the
+frame into the output buffer and overwrites the two shifted channels in
+place: no split, resampling or merge, and bit-identical to warping each
+channel with a translation. The radial look resamples two channels with
+cv2.remap through fixed-point maps that depend only on the frame size and
+strength, so they are built once and cached. Like a real lens its
+strength doesn't animate.
+"""
+from functools import lru_cache
+import threading
+
+import cv2
+import numpy as np
+
+CA_MODES = ("shift", "radial")
+CA_MAX_SHIFT = 5  # Pixels at 1080p
+
+_local = threading.local()
+
+
+def shift_channels(image: np.ndarray, shift: int, dst: np.ndarray | None = None) -> np.ndarray:
+    """
+    Shift channel 0 right and channel 2 left by `shift` pixels.
+
+    Uncovered columns are black. Returns image itself for a zero shift.
+    """
+    w = image.shape[1]
+    shift = min(shift, w)
+    if shift <= 0:
+        return image
+    if dst is None:
+        dst = np.empty_like(image)
+
+    np.copyto(dst, image)
+    dst[:, shift:, 0] = image[:, :w - shift, 0]
+    dst[:, :shift, 0] = 0
+    dst[:, :w - shift, 2] = image[:, shift:, 2]
+    dst[:, w - shift:, 2] = 0
+    return dst
+
+
+@lru_cache(maxsize=4)
+def radial_maps(size: tuple[int, int], strength: float) -> tuple[tuple[np.ndarray, np.ndarray], ...]:
+    """
+    Fixed-point remap tables for channels 0 (magnified) and 2 (shrunk).
+
+    Displacement grows with the square of the distance from the centre and
+    reaches `strength` pixels in the corners.
+
+    Returns:
+        ((map1, map2) for channel 0, (map1, map2) for channel 2), as
+        produced by cv2.convertMaps for cv2.remap
+    """
+    w, h = size
+    cx, cy = (w - 1) / 2, (h - 1) / 2
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    dx, dy = x - cx, y - cy
+    # d(r) = strength * (r / r_max)^2 along the radius, i.e. scale by strength * r / r_max^2
+    factor = np.float32(strength / (cx * cx + cy * cy)) * np.sqrt(dx * dx + dy * dy)
+
+    maps = []
+    for sign in (-1, 1):
+        map_x = x + sign * factor * dx
+        map_y = y + sign * factor * dy
+        maps.append(cv2.convertMaps(map_x, map_y, cv2.CV_16SC2))
+    return tuple(maps)
+
+
+def _planes(h: int, w: int) -> list[np.ndarray]:
+    """This thread's three single-channel working planes."""
+    planes = getattr(_local, "planes", None)
+    if planes is None or planes[0].shape != (h, w):
+        planes = _local.planes = [np.empty((h, w), dtype=np.uint8) for _ in range(3)]
+    return planes
+
+
+def radial_aberration(image: np.ndarray, strength: float, dst: np.ndarray | None = None) -> np.ndarray:
+    """
+    Lens-style chromatic aberration through cached remap tables.
+
+    Args:
+        image: Input frame (3 channels)
+        strength: Channel displacement in the corners, in pixels
+        dst: Optional output buffer (must not be image)
+    """
+    if strength <= 0:
+        return image
+    h, w = image.shape[:2]
+    outward, inward = radial_maps((w, h), float(strength))
+    first, green, last = _planes(h, w)
+
+    cv2.extractChannel(image, 0, dst=green)
+    cv2.remap(green, *outward, cv2.INTER_LINEAR, dst=first, borderMode=cv2.BORDER_REPLICATE)
+    cv2.extractChannel(image, 2, dst=green)
+    cv2.remap(green, *inward, cv2.INTER_LINEAR, dst=last, borderMode=cv2.BORDER_REPLICATE)
+    cv2.extractChannel(image, 1, dst=green)
+    return cv2.merge([first, green, last], dst=dst)
@@ -0,0 +1,248 @@
+"""HTTP delivery of finished videos.
+
+A rendered video never changes once its job has finished, so it is served
+with a strong ETag (the SHA-256 of the file), Last-Modified and a long
+Cache-Control. Clients and CDNs can then revalidate with If-None-Match or
+If-Modified-Since and get a 304 instead of the whole file.
+
+Single byte ranges (Range/206, If-Range, 416) and HEAD are handled here
+rather than left to Starlette's FileResponse, whose range support depends
+on the Starlette version (the pinned one has none). Ranges let players
+seek and start playback before the download finishes; multi-range
+requests are answered with the whole file, as RFC 9110 allows. Outputs
+are written with +faststart (see services.encode_profile), so the index
+players need is at the front.
+Videos served from the render cache are hard links to one file, so every
+job with the same output shares one ETag.
+
+Live renders also expose their HLS playlist and fMP4 segments. The
+playlist grows while the job runs and is never cached; segments are
+written once (atomically) and cached like videos.
+"""
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+import asyncio
+import os
+import re
+import threading
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+from config import VIDEO_CACHE_CONTROL
+from utils.file_manager import file_sha256
+
+_ETAG_CACHE_SIZE = 4096
+_READ_CHUNK_SIZE = 256 * 1024
+
+_BYTE_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+# Files ffmpeg's HLS muxer writes for a live render
+_LIVE_FILE = re.compile(r"index\.m3u8|init\.mp4|index\d+\.m4s")
+LIVE_MEDIA_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".mp4": "video/mp4",
+    ".m4s": "video/iso.segment",
+}
+
+_etags: OrderedDict[tuple, str] = OrderedDict()
+_etags_lock = threading.Lock()
+
+
+def video_etag(path: Path, stat_result: os.stat_result) -> str:
+    """Strong ETag for a file, hashed once per (inode, size, mtime)."""
+    key = (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+    with _etags_lock:
+        etag = _etags.get(key)
+        if etag is not None:
+            _etags.move_to_end(key)
+            return etag
+
+    etag = f'"{file_sha256(path)}"'
+    with _etags_lock:
+        _etags[key] = etag
+        while len(_etags) > _ETAG_CACHE_SIZE:
+            _etags.popitem(last=False)
+    return etag
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    if header.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return since is not None and int(mtime) <= since.timestamp()
+
+
+class RangeNotSatisfiable(ValueError):
+    """A Range header none of whose bytes exist in the file (416)."""
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single-range Range header.
+
+    Args:
+        header: Range header value
+        size: File size in bytes
+
+    Returns:
+        (start, end) with end inclusive, or None if the header should be
+        ignored (malformed, not bytes, or several ranges)
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the file
+    """
+    match = _BYTE_RANGE.fullmatch(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def _if_range_matches(header: str, etag: str, mtime: float) -> bool:
+    # If-Range needs a strong match: an identical ETag or the exact Last-Modified
+    header = header.strip()
+    if header.startswith(("\"", "W/")):
+        return header == etag
+    try:
+        date = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return date is not None and int(mtime) == date.timestamp()
+
+
+def _content_disposition(filename: str, download: bool) -> str:
+    disposition = "attachment" if download else "inline"
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+async def _read_range(path: Path, start: int, length: int):
+    """Yield length bytes of path from start, reading off the event loop."""
+    file = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(file.seek, start)
+        while length > 0:
+            chunk = await asyncio.to_thread(file.read, min(_READ_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def video_response(
+    request: Request,
+    path: Path,
+    filename: str = "product_video_3d.mp4",
+    download: bool = False
+) -> Response:
+    """
+    Serve a finished video with validators, caching and range support.
+
+    Args:
+        request: Incoming GET or HEAD request (its conditional headers are honoured)
+        path: Video file
+        filename: Name suggested to the client
+        download: Send Content-Disposition: attachment instead of inline
+
+    Returns:
+        304 if the client's copy is current, 206 for a satisfiable Range,
+        416 for an unsatisfiable one, otherwise the whole file (headers
+        only for HEAD)
+    """
+    stat_result = await asyncio.to_thread(os.stat, path)
+    etag = await asyncio.to_thread(video_etag, path, stat_result)
+    headers = {"etag": etag, "cache-control": VIDEO_CACHE_CONTROL}
+
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        not_modified = if_modified_since is not None and _not_modified_since(if_modified_since, stat_result.st_mtime)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    size = stat_result.st_size
+    headers.update({
+        "accept-ranges": "bytes",
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "content-disposition": _content_disposition(filename, download),
+    })
+    status_code, start, end = 200, 0, size - 1
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header is not None and (if_range is None or _if_range_matches(if_range, etag, stat_result.st_mtime)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            headers["content-range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            status_code, (start, end) = 206, byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+    length = end - start + 1
+    headers["content-length"] = str(length)
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type="video/mp4")
+    return StreamingResponse(
+        _read_range(path, start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type="video/mp4",
+    )
+
+
+def live_file_response(live_dir: Path, name: str) -> Response | None:
+    """
+    Serve a file of a live render's HLS output.
+
+    Args:
+        live_dir: The job's live directory
+        name: Playlist, init segment or media segment name
+
+    Returns:
+        The response, or None if name is not a live file or does not exist (yet)
+    """
+    if not _LIVE_FILE.fullmatch(name):
+        return None
+    path = live_dir / name
+    if not path.is_file():
+        return None
+    suffix = path.suffix
+    cache_control = "no-cache" if suffix == ".m3u8" else VIDEO_CACHE_CONTROL
+    return FileResponse(path, media_type=LIVE_MEDIA_TYPES[suffix], headers={"cache-control": cache_control})
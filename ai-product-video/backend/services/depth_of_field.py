@@ -0,0 +1,122 @@
+"""Depth of field engine.
+
+The focus mask is a radial falloff around a moving focus point: 1.0 at
+the focus, 0.0 beyond `radius`. Only its position changes between frames,
+so the falloff is computed once as a fixed-point (0..256) table and each
+frame uses a window of it placed at the focus point. Outside that window
+the frame is fully blurred, so only the window is blended, in uint16
+fixed point into a preallocated buffer.
+
+The table only needs to reach from the focus point to the far edge of the
+frame, so its extent is the radius clipped to that distance (the weights
+still fall off over the full radius), and the blend buffers are never
+larger than the frame. A huge radius therefore costs no more memory than
+one that just covers the frame.
+
+Engines keep per-size buffers and are cached per thread, since render
+jobs run concurrently on the job worker threads. Each thread keeps only
+the DOF_ENGINE_CACHE_SIZE most recently used engines.
+"""
+from collections import OrderedDict
+import math
+import threading
+import cv2
+import numpy as np
+
+from services.render_profile import scale_for
+
+DOF_RADIUS = 200        # Pixels from the focus point to full blur
+MAX_DOF_RADIUS = 1000   # Largest radius a request may ask for (at 1080p)
+DOF_FOCUS_TRAVEL = 100  # How far the focus point moves from the centre (at 1080p)
+DOF_KERNEL = (21, 21)
+DOF_SIGMA = 5
+DOF_ENGINE_CACHE_SIZE = 2  # Engines kept per thread
+
+_local = threading.local()
+
+
+class DepthOfFieldEngine:
+    """Reusable DOF renderer for one frame size."""
+
+    def __init__(self, size: tuple[int, int], radius: int = DOF_RADIUS):
+        self.w, self.h = size
+        self.radius = radius = max(int(radius), 1)
+        self.travel = DOF_FOCUS_TRAVEL * scale_for(size)
+
+        # Farthest a pixel can be from the focus point along either axis
+        reach = (max(self.w, self.h) + 1) // 2 + math.ceil(self.travel) + 1
+        self.extent = extent = min(radius, reach)
+
+        # Falloff table centred at (extent, extent), weights 0..256
+        y, x = np.ogrid[-extent:extent + 1, -extent:extent + 1]
+        dist = np.sqrt(x * x + y * y)
+        falloff = 1.0 - np.clip(dist / radius, 0, 1)
+        self.falloff = np.rint(falloff * 256).astype(np.uint16)[:, :, None]
+        self.inverse = (256 - self.falloff).astype(np.uint16)
+
+        self.out = np.empty((self.h, self.w, 3), dtype=np.uint8)
+        side = 2 * extent + 1
+        self._sharp = np.empty((min(side, self.h), min(side, self.w), 3), dtype=np.uint16)
+        self._soft = np.empty_like(self._sharp)
+
+    def focus_point(self, progress: float) -> tuple[int, int]:
+        center_x, center_y = self.w // 2, self.h // 2
+        focus_x = int(center_x + self.travel * np.sin(progress * np.pi * 2))
+        focus_y = int(center_y + self.travel * np.cos(progress * np.pi * 2))
+        return focus_x, focus_y
+
+    def apply(self, image: np.ndarray, progress: float) -> np.ndarray:
+        """
+        Blur everything but the moving focus area.
+
+        The returned array is this engine's output buffer and is
+        overwritten by the next call.
+        """
+        out = self.out
+        cv2.GaussianBlur(image, DOF_KERNEL, DOF_SIGMA, dst=out)
+
+        focus_x, focus_y = self.focus_point(progress)
+        r = self.extent
+
+        # Window of the frame covered by the falloff table, clipped to the frame
+        x0, x1 = max(focus_x - r, 0), min(focus_x + r + 1, self.w)
+        y0, y1 = max(focus_y - r, 0), min(focus_y + r + 1, self.h)
+        if x0 >= x1 or y0 >= y1:
+            return out
+
+        # Matching view into the table
+        tx0, ty0 = x0 - (focus_x - r), y0 - (focus_y - r)
+        tx1, ty1 = tx0 + (x1 - x0), ty0 + (y1 - y0)
+        weight = self.falloff[ty0:ty1, tx0:tx1]
+        inverse = self.inverse[ty0:ty1, tx0:tx1]
+
+        sharp = self._sharp[:y1 - y0, :x1 - x0]
+        soft = self._soft[:y1 - y0, :x1 - x0]
+        window = out[y0:y1, x0:x1]
+
+        # (sharp * w + blurred * (256 - w) + 128) >> 8
+        np.multiply(image[y0:y1, x0:x1], weight, out=sharp)
+        np.multiply(window, inverse, out=soft)
+        sharp += soft
+        sharp += 128
+        sharp >>= 8
+        np.copyto(window, sharp, casting='unsafe')
+
+        return out
+
+
+def get_dof_engine(size: tuple[int, int], radius: int = DOF_RADIUS) -> DepthOfFieldEngine:
+    """Return this thread's engine for the given frame size and radius."""
+    engines = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = OrderedDict()
+    key = (tuple(size), max(int(radius), 1))
+    engine = engines.get(key)
+    if engine is not None:
+        engines.move_to_end(key)
+        return engine
+
+    engine = engines[key] = DepthOfFieldEngine(*key)
+    while len(engines) > DOF_ENGINE_CACHE_SIZE:
+        engines.popitem(last=False)
+    return engine
@@ -0,0 +1,432 @@
+"""Effect registry and pipeline builder.
+
+Each effect registers itself with its parameters, a cost class and,
+for geometric effects, a matrix builder:
+
+    @register_effect("pan", cost_class=GEOMETRIC, matrix=pan_matrix,
+                     params={"pan_amount": 25}, default=True, ...)
+    def apply_camera_pan(image, progress, pan_amount=30): ...
+
+build_pipeline() turns a request's effect settings into ordered stages.
+Geometric effects run first and every run of consecutive effects with a
+matrix builder is fused into one warp using a precomputed transform plan;
+convolution effects follow, then per-channel effects. Stage timings go
+to the render_stage_seconds histogram, so /effects can report what each
+stage actually costs.
+
+Effects registered with motion=True (motion blur) are also given the
+frame's on-screen motion, derived from the geometric effects before them
+(services.transform_plan.build_motion_plan). When such an effect's
+`samples` parameter is 2 or more, the warp before it renders and averages
+that many sub-frames instead (services.motion_blur.SubframeAccumulator)
+and the effect itself is not called.
+
+Pipelines can render allocation-free: given services.frame_buffers'
+per-thread buffers, stages ping-pong between two scratch frames, passing
+the one to write as `dst` to effects whose function accepts it.
+
+Effect settings accept either a bool or a dict of parameter overrides,
+e.g. {"zoom": {"zoom_range": 0.25}, "pan": false}. An override must have
+the type of the parameter's default (an int where the default is an int,
+any number for a float, a list of numbers of the same length for a
+tuple) and lie within the effect's `limits`, so bad settings are
+rejected when a request arrives rather than failing in a render worker.
+Parameters listed in an effect's `scaled_params` are pixels at the
+reference resolution and are scaled to the frame size when the pipeline
+is built.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable
+import inspect
+import time
+
+import cv2
+import numpy as np
+
+from services.frame_buffers import FrameBuffers
+from services.metrics import STAGE_SECONDS
+from services.motion_blur import MAX_SUBFRAMES, get_subframe_accumulator
+from services.render_profile import scale_for
+from services.transform_plan import (
+    apply_transform,
+    build_motion_plan,
+    build_subframe_plan,
+    build_transform_plan,
+)
+
+GEOMETRIC = "geometric"
+CONVOLUTION = "convolution"
+PER_CHANNEL = "per_channel"
+
+COST_CLASS_ORDER = (GEOMETRIC, CONVOLUTION, PER_CHANNEL)
+
+
+@dataclass(frozen=True)
+class Effect:
+    name: str
+    apply: Callable[..., np.ndarray]
+    cost_class: str
+    description: str = ""
+    default: bool = False
+    params: dict = field(default_factory=dict)
+    matrix: Callable[..., np.ndarray] | None = None
+    border_mode: int = cv2.BORDER_CONSTANT
+    order: int = 0
+    scaled_params: tuple = ()
+    accepts_dst: bool = False
+    uses_motion: bool = False
+    choices: dict = field(default_factory=dict)
+    limits: dict = field(default_factory=dict)
+
+    @property
+    def fusable(self) -> bool:
+        return self.matrix is not None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "default": self.default,
+            "cost_class": self.cost_class,
+            "fusable": self.fusable,
+            "params": dict(self.params),
+            "scaled_params": list(self.scaled_params),
+            "uses_motion": self.uses_motion,
+            "choices": {name: list(values) for name, values in self.choices.items()},
+            "limits": {name: list(bounds) for name, bounds in self.limits.items()},
+        }
+
+    def scale_params(self, params: dict, scale: float) -> dict:
+        """Scale pixel-valued parameters from the reference resolution."""
+        if scale == 1.0 or not self.scaled_params:
+            return params
+        scaled = dict(params)
+        for name in self.scaled_params:
+            value = scaled.get(name)
+            if isinstance(value, int) and not isinstance(value, bool):
+                scaled[name] = int(round(value * scale))
+            elif isinstance(value, float):
+                scaled[name] = value * scale
+        return scaled
+
+
+_registry: dict[str, Effect] = {}
+
+
+def register_effect(
+    name: str,
+    *,
+    cost_class: str,
+    description: str = "",
+    default: bool = False,
+    params: dict | None = None,
+    matrix: Callable[..., np.ndarray] | None = None,
+    border_mode: int = cv2.BORDER_CONSTANT,
+    order: int = 0,
+    scaled_params: tuple = (),
+    motion: bool = False,
+    choices: dict | None = None,
+    limits: dict | None = None
+):
+    """
+    Decorator registering an effect function.
+
+    Args:
+        name: Key used in effect settings
+        cost_class: GEOMETRIC, CONVOLUTION or PER_CHANNEL
+        description: Human readable description for /effects
+        default: Whether the effect is on when a request doesn't mention it
+        params: Parameter defaults passed to the function as keywords
+        matrix: For geometric effects, fn(progress, w, h, **params) -> 3x3 matrix;
+            effects with a matrix are fused into a single warp
+        border_mode: cv2 border mode the effect uses for uncovered areas
+        order: Position within the cost class (lower runs first)
+        scaled_params: Names of params given in pixels at the reference
+            resolution; they are scaled with the frame size
+        motion: Pass the function the frame's motion as `motion`, a
+            (rows, cols, 2) array of velocities (see build_motion_plan);
+            with params samples >= 2, shutter and subframe_scale the
+            preceding warp accumulates sub-frames instead
+        choices: Allowed values of enumerated params, {param: (value, ...)}
+        limits: Inclusive (min, max) of numeric params, {param: (min, max)};
+            for tuple params they bound every element
+
+    Functions with a `dst` keyword are passed a preallocated output frame
+    (distinct from the input) and should write their result into it.
+    """
+    if cost_class not in COST_CLASS_ORDER:
+        raise ValueError(f"Unknown cost class: {cost_class}")
+
+    def decorator(fn):
+        _registry[name] = Effect(
+            name=name,
+            apply=fn,
+            cost_class=cost_class,
+            description=description,
+            default=default,
+            params=dict(params or {}),
+            matrix=matrix,
+            border_mode=border_mode,
+            order=order,
+            scaled_params=tuple(scaled_params),
+            accepts_dst="dst" in inspect.signature(fn).parameters,
+            uses_motion=motion,
+            choices=dict(choices or {}),
+            limits=dict(limits or {}),
+        )
+        return fn
+
+    return decorator
+
+
+def get_effect(name: str) -> Effect | None:
+    return _registry.get(name)
+
+
+def list_effects() -> list[Effect]:
+    """Registered effects in pipeline order."""
+    return sorted(_registry.values(), key=_sort_key)
+
+
+def _sort_key(effect: Effect):
+    return (COST_CLASS_ORDER.index(effect.cost_class), effect.order, effect.name)
+
+
+def _check_number(label: str, default, value, limits: tuple | None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Invalid {label}: expected a number, got {value!r}")
+    if isinstance(default, int) and not isinstance(value, int):
+        raise ValueError(f"Invalid {label}: expected an integer, got {value!r}")
+    value = type(default)(value)
+    # Written so that NaN fails too
+    if limits is not None and not limits[0] <= value <= limits[1]:
+        raise ValueError(f"Invalid {label}: {value!r} is outside [{limits[0]}, {limits[1]}]")
+    return value
+
+
+def _check_param(effect: Effect, name: str, value):
+    """
+    Validate a parameter override against the type of its default and its limits.
+
+    Returns:
+        The value normalized to the default's type (a float for float
+        params, a tuple for tuple params), so settings stay hashable
+
+    Raises:
+        ValueError: If the value has the wrong type or is out of range
+    """
+    default = effect.params[name]
+    label = f"{name} for effect '{effect.name}'"
+    limits = effect.limits.get(name)
+    if isinstance(default, str):
+        if not isinstance(value, str):
+            raise ValueError(f"Invalid {label}: expected a string, got {value!r}")
+        return value
+    if isinstance(default, tuple):
+        if not isinstance(value, (list, tuple)) or len(value) != len(default):
+            raise ValueError(f"Invalid {label}: expected {len(default)} numbers, got {value!r}")
+        return tuple(_check_number(label, d, v, limits) for d, v in zip(default, value))
+    return _check_number(label, default, value, limits)
+
+
+def resolve_effects(effects: dict) -> tuple[tuple[str, tuple], ...]:
+    """
+    Normalize effect settings into enabled effects with full parameters.
+
+    Unknown effect names are ignored; unknown parameter names, values of
+    the wrong type, outside an effect's limits or outside its choices
+    raise ValueError.
+
+    Returns:
+        ((name, ((param, value), ...)), ...) in pipeline order
+    """
+    resolved = []
+    for effect in list_effects():
+        setting = effects.get(effect.name, effect.default)
+        if isinstance(setting, dict):
+            unknown = set(setting) - set(effect.params) - {"enabled"}
+            if unknown:
+                raise ValueError(f"Unknown parameters for effect '{effect.name}': {sorted(unknown)}")
+            enabled = setting.get("enabled", True)
+            if not isinstance(enabled, bool):
+                raise ValueError(f"Invalid enabled for effect '{effect.name}': expected true or false")
+            if not enabled:
+                continue
+            params = dict(effect.params)
+            for name, value in setting.items():
+                if name != "enabled":
+                    params[name] = _check_param(effect, name, value)
+        elif isinstance(setting, bool):
+            if not setting:
+                continue
+            params = dict(effect.params)
+        else:
+            raise ValueError(f"Invalid setting for effect '{effect.name}': expected true, false or an object")
+        for name, allowed in effect.choices.items():
+            if params.get(name) not in allowed:
+                raise ValueError(f"Invalid {name} '{params.get(name)}' for effect '{effect.name}'. Allowed: {list(allowed)}")
+        resolved.append((effect.name, tuple(sorted(params.items()))))
+    return tuple(resolved)
+
+
+class Stage:
+    """One step of a pipeline: a fused warp or a single effect."""
+
+    def __init__(self, name: str, cost_class: str, effects: list[str]):
+        self.name = name
+        self.cost_class = cost_class
+        self.effects = effects
+
+    def run(self, frame: np.ndarray, index: int, progress: float, dst: np.ndarray | None = None) -> np.ndarray:
+        """Render the stage, writing into dst if given (dst is never frame)."""
+        raise NotImplementedError
+
+
+class WarpStage(Stage):
+    def __init__(
+        self,
+        steps: list[tuple[Effect, dict]],
+        frame_count: int,
+        size: tuple[int, int],
+        blur: tuple[Effect, dict] | None = None
+    ):
+        names = [effect.name for effect, _ in steps]
+        if blur is not None:
+            names.append(blur[0].name)
+        super().__init__("+".join(names), GEOMETRIC, names)
+        plan_steps = _plan_steps(steps)
+        self.plan = build_transform_plan(plan_steps, frame_count, size)
+        reflect = any(effect.border_mode == cv2.BORDER_REFLECT for effect, _ in steps)
+        self.border_mode = cv2.BORDER_REFLECT if reflect else cv2.BORDER_CONSTANT
+
+        self.subframes = None
+        if blur is not None:
+            params = blur[1]
+            samples = min(int(params["samples"]), MAX_SUBFRAMES)
+            self.subframes = build_subframe_plan(plan_steps, frame_count, size, samples, float(params["shutter"]))
+            self.accumulator = (tuple(size), samples, float(params["subframe_scale"]))
+
+    def run(self, frame, index, progress, dst=None):
+        if self.subframes is not None:
+            accumulator = get_subframe_accumulator(*self.accumulator)
+            return accumulator.render(frame, self.plan[index], self.subframes[index], self.border_mode, dst)
+        return apply_transform(frame, self.plan[index], self.border_mode, dst)
+
+
+class EffectStage(Stage):
+    def __init__(self, effect: Effect, params: dict, motion: tuple | None = None):
+        super().__init__(effect.name, effect.cost_class, [effect.name])
+        self.fn = effect.apply
+        self.params = params
+        self.accepts_dst = effect.accepts_dst
+        self.motion = motion
+
+    def run(self, frame, index, progress, dst=None):
+        params = self.params
+        if self.motion is not None:
+            params = {**params, "motion": self.motion[index]}
+        if self.accepts_dst and dst is not None:
+            return self.fn(frame, progress, dst=dst, **params)
+        return self.fn(frame, progress, **params)
+
+
+class Pipeline:
+    """Ordered stages for one set of effect settings, size and frame count."""
+
+    def __init__(self, stages: list[Stage]):
+        self.stages = stages
+
+    def render(
+        self,
+        frame: np.ndarray,
+        index: int,
+        frame_count: int,
+        buffers: FrameBuffers | None = None
+    ) -> np.ndarray:
+        """
+        Run every stage on frame.
+
+        With buffers, stages write into its scratch frames, so the result
+        may be one of them (or an effect's own buffer) and is only valid
+        until the next render on this thread.
+        """
+        progress = index / (frame_count - 1) if frame_count > 1 else 0.0
+        for stage in self.stages:
+            start = time.perf_counter()
+            dst = buffers.scratch_for(frame) if buffers is not None else None
+            frame = stage.run(frame, index, progress, dst)
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=f"effect:{stage.name}")
+        return frame
+
+
+def _plan_steps(steps: list[tuple[Effect, dict]]) -> tuple:
+    return tuple((effect.matrix, tuple(sorted(params.items()))) for effect, params in steps)
+
+
+def build_pipeline(effects: dict, frame_count: int, size: tuple[int, int]) -> Pipeline:
+    """
+    Build (or fetch from cache) the pipeline for a request's effect settings.
+
+    Args:
+        effects: Dictionary of effect settings
+        frame_count: Number of frames in the video
+        size: Frame (width, height)
+    """
+    return _cached_pipeline(resolve_effects(effects), frame_count, tuple(size))
+
+
+@lru_cache(maxsize=64)
+def _cached_pipeline(resolved: tuple, frame_count: int, size: tuple[int, int]) -> Pipeline:
+    stages: list[Stage] = []
+    fused: list[tuple[Effect, dict]] = []
+    geometric: list[tuple[Effect, dict]] = []
+
+    def flush(blur=None):
+        if fused:
+            stages.append(WarpStage(list(fused), frame_count, size, blur))
+            fused.clear()
+
+    scale = scale_for(size)
+    for name, params in resolved:
+        effect = _registry[name]
+        params = effect.scale_params(dict(params), scale)
+        if effect.fusable:
+            fused.append((effect, params))
+            geometric.append((effect, params))
+            continue
+        if effect.uses_motion and params.get("samples", 0) >= 2:
+            # Rendered by the warp; without one before it nothing moves
+            flush((effect, params))
+            continue
+        flush()
+        motion = build_motion_plan(_plan_steps(geometric), frame_count, size) if effect.uses_motion else None
+        stages.append(EffectStage(effect, params, motion))
+    flush()
+
+    return Pipeline(stages)
+
+
+def stage_costs() -> dict:
+    """Average measured ms/frame for every effect stage that has run."""
+    costs = {}
+    for (stage,), (count, seconds) in STAGE_SECONDS.snapshot().items():
+        if stage.startswith("effect:") and count:
+            costs[stage[len("effect:"):]] = {"frames": count, "ms_per_frame": round(1000 * seconds / count, 3)}
+    return costs
+
+
+def effect_costs() -> dict:
+    """
+    Measured ms/frame per effect.
+
+    Fused geometric effects share one warp, so they report the cost of
+    the cheapest measured warp they took part in and the stage name.
+    """
+    costs = {}
+    for stage, cost in stage_costs().items():
+        for name in stage.split("+"):
+            best = costs.get(name)
+            if best is None or cost["ms_per_frame"] < best["ms_per_frame"]:
+                costs[name] = {**cost, "stage": stage}
+    return costs
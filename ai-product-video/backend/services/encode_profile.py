@@ -0,0 +1,185 @@
+"""Named encoder profiles.
+
+Encoding is a large fixed share of every job, so requests pick how to
+trade encode speed against file size:
+
+    fast-preview  ultrafast, CRF 28, zerolatency (no lookahead)
+    balanced      veryfast, CRF 22 (default)
+    archive       slow, CRF 18, tune film
+
+Presets and CRF values are in x264 terms. Other codecs (HEVC, VP9, AV1)
+are offered when the local ffmpeg has an encoder for them; the preset is
+mapped onto their speed settings and the CRF onto their scale. Every
+output is an MP4 with the moov atom up front (+faststart), so players
+can start before the download finishes.
+"""
+from dataclasses import dataclass, replace
+from functools import lru_cache
+import logging
+import subprocess
+
+from config import ENCODE_THREADS
+
+logger = logging.getLogger(__name__)
+
+X264_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+
+# x264 preset -> libvpx/libaom cpu-used (higher is faster)
+_CPU_USED = {
+    "ultrafast": 8, "superfast": 8, "veryfast": 6, "faster": 5, "fast": 4,
+    "medium": 3, "slow": 2, "slower": 1, "veryslow": 0,
+}
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    encoder: str
+    crf_offset: int = 0          # Added to the x264-scale CRF
+    max_crf: int = 51
+    tunes: tuple = ()
+
+
+CODECS = {
+    "h264": Codec("h264", "libx264", tunes=("film", "animation", "grain", "stillimage", "fastdecode", "zerolatency")),
+    "hevc": Codec("hevc", "libx265", crf_offset=5, tunes=("animation", "grain", "fastdecode", "zerolatency")),
+    "vp9": Codec("vp9", "libvpx-vp9", crf_offset=10, max_crf=63),
+    "av1": Codec("av1", "libaom-av1", crf_offset=10, max_crf=63),
+}
+
+
+@dataclass(frozen=True)
+class EncodeProfile:
+    name: str
+    preset: str
+    crf: int
+    tune: str | None = None
+    codec: str = "h264"
+    threads: int = ENCODE_THREADS  # 0 lets ffmpeg decide
+
+    @property
+    def encoder(self) -> str:
+        return CODECS[self.codec].encoder
+
+    def ffmpeg_params(self, faststart: bool = True) -> list[str]:
+        """
+        Output options passed to ffmpeg after the codec and preset.
+
+        Args:
+            faststart: Add -movflags +faststart (leave it out when the
+                muxer is not a plain MP4, e.g. tee for live output)
+        """
+        codec = CODECS[self.codec]
+        crf = min(self.crf + codec.crf_offset, codec.max_crf)
+        params = ["-crf", str(crf), "-pix_fmt", "yuv420p"]
+        if faststart:
+            params += ["-movflags", "+faststart"]
+
+        if self.tune and self.tune in codec.tunes:
+            params += ["-tune", self.tune]
+
+        if self.codec == "hevc":
+            # hvc1 tag so Safari/QuickTime play it
+            params += ["-tag:v", "hvc1", "-x265-params", "log-level=error"]
+        elif self.codec == "vp9":
+            cpu_used = _CPU_USED[self.preset]
+            deadline = "realtime" if cpu_used >= 6 else "good"
+            params += ["-b:v", "0", "-deadline", deadline, "-cpu-used", str(min(cpu_used, 8)), "-row-mt", "1"]
+        elif self.codec == "av1":
+            # libaom is far slower than libvpx at the same cpu-used
+            cpu_used = min(_CPU_USED[self.preset] + 2, 8)
+            params += ["-b:v", "0", "-cpu-used", str(cpu_used), "-row-mt", "1"]
+            if cpu_used >= 7:
+                params += ["-usage", "realtime"]
+        return params
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "codec": self.codec,
+            "preset": self.preset,
+            "crf": self.crf,
+            "tune": self.tune,
+        }
+
+
+ENCODE_PROFILES = {
+    "fast-preview": EncodeProfile("fast-preview", preset="ultrafast", crf=28, tune="zerolatency"),
+    "balanced": EncodeProfile("balanced", preset="veryfast", crf=22),
+    "archive": EncodeProfile("archive", preset="slow", crf=18, tune="film"),
+}
+
+DEFAULT_ENCODE_PROFILE = ENCODE_PROFILES["balanced"]
+
+
+@lru_cache(maxsize=1)
+def available_encoders() -> frozenset[str]:
+    """Video encoders the configured ffmpeg binary provides."""
+    from moviepy.config import get_setting
+
+    try:
+        result = subprocess.run(
+            [get_setting("FFMPEG_BINARY"), "-hide_banner", "-encoders"],
+            capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not list ffmpeg encoders: {e}")
+        return frozenset({"libx264"})
+
+    encoders = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        # " V....D libx264   description"
+        if len(parts) >= 2 and parts[0].startswith("V"):
+            encoders.add(parts[1])
+    return frozenset(encoders)
+
+
+def available_codecs() -> list[str]:
+    encoders = available_encoders()
+    return [name for name, codec in CODECS.items() if codec.encoder in encoders]
+
+
+def parse_encode_profile(name: str | None = None, codec: str | None = None, tune: str | None = None) -> EncodeProfile:
+    """
+    Resolve a request's encode options.
+
+    Args:
+        name: One of ENCODE_PROFILES (default "balanced")
+        codec: One of CODECS, if the local ffmpeg supports it (default h264)
+        tune: Encoder tune overriding the profile's (x264/x265 only)
+
+    Raises:
+        ValueError: If an option is unknown or unsupported here
+    """
+    if name is None:
+        profile = DEFAULT_ENCODE_PROFILE
+    elif name in ENCODE_PROFILES:
+        profile = ENCODE_PROFILES[name]
+    else:
+        raise ValueError(f"Unknown encode profile '{name}'. Allowed: {list(ENCODE_PROFILES)}")
+
+    if codec is not None and codec != profile.codec:
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}'. Allowed: {list(CODECS)}")
+        if codec not in available_codecs():
+            raise ValueError(f"Codec '{codec}' is not supported by this server's ffmpeg. Available: {available_codecs()}")
+        profile = replace(profile, codec=codec)
+
+    if tune is not None:
+        allowed = CODECS[profile.codec].tunes
+        if tune not in allowed:
+            raise ValueError(f"Tune '{tune}' is not available for {profile.codec}. Allowed: {list(allowed)}")
+        profile = replace(profile, tune=tune)
+
+    return profile
+
+
+def encode_options() -> dict:
+    """Encode profiles and codecs available here, for API discovery."""
+    return {
+        "profiles": {name: profile.to_dict() for name, profile in ENCODE_PROFILES.items()},
+        "default": DEFAULT_ENCODE_PROFILE.name,
+        "codecs": available_codecs(),
+        "tunes": {name: list(codec.tunes) for name, codec in CODECS.items() if codec.tunes},
+    }
@@ -0,0 +1,73 @@
+"""Preallocated frame buffers for the render loop.
+
+Rendering a frame used to allocate a new full-size array at every step:
+the blend, each effect, the colour conversion. Here every step writes into
+a buffer allocated once per frame size instead (OpenCV's dst= argument):
+
+    blend      cross-fade of the two sources
+    scratch    two buffers effect stages ping-pong between
+    FrameRing  RGB output frames handed to the encoder
+
+Scratch buffers only live for one render_3d_frame call, so they are cached
+per thread like the depth of field engines, keeping the
+FRAME_BUFFER_CACHE_SIZE most recently used frame sizes. An output ring belongs to one
+frame iterator: a yielded frame stays valid until `size` more frames have
+been yielded, which covers the encoder (it is done with a frame before
+asking for the next one). Callers that keep frames must copy them.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import FRAME_BUFFER_CACHE_SIZE, FRAME_RING_SIZE
+
+_local = threading.local()
+
+
+def _frame(size: tuple[int, int]) -> np.ndarray:
+    w, h = size
+    return np.empty((h, w, 3), dtype=np.uint8)
+
+
+class FrameBuffers:
+    """Per-thread working buffers for one frame size."""
+
+    def __init__(self, size: tuple[int, int]):
+        self.size = tuple(size)
+        self.blend = _frame(size)
+        self._scratch = (_frame(size), _frame(size))
+
+    def scratch_for(self, src: np.ndarray) -> np.ndarray:
+        """A scratch buffer a stage reading src can write into."""
+        first, second = self._scratch
+        return second if src is first else first
+
+
+class FrameRing:
+    """Round-robin output frames for one frame iterator."""
+
+    def __init__(self, size: tuple[int, int], count: int = FRAME_RING_SIZE):
+        self._frames = [_frame(size) for _ in range(max(1, count))]
+        self._next = 0
+
+    def next(self) -> np.ndarray:
+        frame = self._frames[self._next]
+        self._next = (self._next + 1) % len(self._frames)
+        return frame
+
+
+def get_frame_buffers(size: tuple[int, int]) -> FrameBuffers:
+    """Return this thread's working buffers for the given frame (width, height)."""
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        buffers = _local.buffers = OrderedDict()
+    key = tuple(size)
+    frame_buffers = buffers.get(key)
+    if frame_buffers is not None:
+        buffers.move_to_end(key)
+        return frame_buffers
+    frame_buffers = buffers[key] = FrameBuffers(key)
+    while len(buffers) > FRAME_BUFFER_CACHE_SIZE:
+        buffers.popitem(last=False)
+    return frame_buffers
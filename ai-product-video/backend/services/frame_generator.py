@@ -1,11 +1,14 @@
 from pathlib import Path
 from PIL import Image
+import cv2
 import numpy as np
-from config import FRAME_COUNT
+from services.render_profile import DEFAULT_PROFILE, RenderProfile
+from services.image_loader import load_image
 
 
 def generate_transition_frames(
-    image1_path: Path, image2_path: Path, output_dir: Path
+    image1_path: Path, image2_path: Path, output_dir: Path,
+    profile: RenderProfile = DEFAULT_PROFILE
 ) -> list[Path]:
     """
     Generate smooth transition frames between two images.
@@ -14,6 +17,7 @@ def generate_transition_frames(
         image1_path: Path to initial image
         image2_path: Path to final image
         output_dir: Directory to save frames
+        profile: Output size and frame count
     
     Returns:
         List of paths to generated frames
@@ -21,31 +25,28 @@ def generate_transition_frames(
     # Create output directory
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Load images
-    img1 = Image.open(image1_path)
-    img2 = Image.open(image2_path)
+    # Load images resized to the same dimensions (BGR uint8)
+    size = profile.size
+    arr1 = load_image(image1_path, size)
+    arr2 = load_image(image2_path, size)
     
-    # Resize to same dimensions
-    size = (1080, 1080)  # Standard square for product videos
-    img1 = img1.resize(size, Image.Resampling.LANCZOS)
-    img2 = img2.resize(size, Image.Resampling.LANCZOS)
-    
-    # Convert to numpy arrays for blending
-    arr1 = np.array(img1, dtype=np.float32)
-    arr2 = np.array(img2, dtype=np.float32)
+    # Blend in uint8 into buffers reused for every frame
+    blended = np.empty_like(arr1)
+    rgb = np.empty_like(arr1)
     
     # Generate frames
     frame_paths = []
-    for i in range(FRAME_COUNT):
+    frame_count = profile.frame_count
+    for i in range(frame_count):
         # Calculate alpha blend value (0.0 to 1.0)
-        alpha = i / (FRAME_COUNT - 1)
+        alpha = i / (frame_count - 1)
         
         # Blend frames
-        blended = (1 - alpha) * arr1 + alpha * arr2
-        blended = np.clip(blended, 0, 255).astype(np.uint8)
+        cv2.addWeighted(arr1, 1 - alpha, arr2, alpha, 0, dst=blended)
+        cv2.cvtColor(blended, cv2.COLOR_BGR2RGB, dst=rgb)
         
         # Convert back to PIL Image
-        frame = Image.fromarray(blended)
+        frame = Image.fromarray(rgb)
         
         # Save frame
         frame_path = output_dir / f"frame_{i:04d}.png"
@@ -1,11 +1,48 @@
 from pathlib import Path
+from typing import Iterator
 import numpy as np
 from PIL import Image
 import cv2
-from config import FRAME_COUNT
+from config import RESOLUTION
+from services.chromatic_aberration import CA_MAX_SHIFT, CA_MODES, radial_aberration, shift_channels
+from services.depth_of_field import DOF_RADIUS, MAX_DOF_RADIUS, get_dof_engine
+from services.frame_buffers import FrameRing, get_frame_buffers
+from services.image_loader import load_image
+from services.metrics import timed
+from services.motion_blur import (
+    MAX_BLUR_LENGTH,
+    MAX_SUBFRAMES,
+    MIN_SUBFRAME_SCALE,
+    MOTION_SAMPLES,
+    MOTION_SHUTTER,
+    SUBFRAME_SCALE,
+    blur_along_motion,
+)
+from services.render_profile import DEFAULT_PROFILE, RenderProfile
+from services.effect_registry import (
+    CONVOLUTION,
+    GEOMETRIC,
+    PER_CHANNEL,
+    build_pipeline,
+    register_effect,
+)
+from services.transform_plan import (
+    pan_matrix,
+    perspective_matrix,
+    rotation_matrix,
+    zoom_matrix,
+)
 
 
-def apply_perspective_transform(image: np.ndarray, progress: float) -> np.ndarray:
+@register_effect(
+    "perspective",
+    cost_class=GEOMETRIC,
+    description="3D perspective tilt - tilts in 3D space",
+    default=True,
+    matrix=perspective_matrix,
+    order=0,
+)
+def apply_perspective_transform(image: np.ndarray, progress: float, dst: np.ndarray = None) -> np.ndarray:
     """
     Apply 3D perspective transform to image.
     Creates a tilting/rotating effect in 3D space.
@@ -13,65 +50,32 @@ def apply_perspective_transform(image: np.ndarray, progress: float) -> np.ndarra
     Args:
         image: Input image as numpy array
         progress: Animation progress (0.0 to 1.0)
+        dst: Optional output buffer
     
     Returns:
         Transformed image
     """
     h, w = image.shape[:2]
     
-    # Calculate rotation angles based on progress
-    angle_x = 15 * np.sin(progress * np.pi * 2)  # Tilt up/down
-    angle_y = 20 * np.cos(progress * np.pi * 2)  # Rotate left/right
-    angle_z = 10 * np.sin(progress * np.pi)       # Spin
-    
-    # Create rotation matrices
-    alpha = np.radians(angle_x)
-    beta = np.radians(angle_y)
-    gamma = np.radians(angle_z)
-    
-    # Combined rotation matrix (XYZ Euler angles)
-    Rx = np.array([
-        [1, 0, 0],
-        [0, np.cos(alpha), -np.sin(alpha)],
-        [0, np.sin(alpha), np.cos(alpha)]
-    ])
-    
-    Ry = np.array([
-        [np.cos(beta), 0, np.sin(beta)],
-        [0, 1, 0],
-        [-np.sin(beta), 0, np.cos(beta)]
-    ])
-    
-    Rz = np.array([
-        [np.cos(gamma), -np.sin(gamma), 0],
-        [np.sin(gamma), np.cos(gamma), 0],
-        [0, 0, 1]
-    ])
-    
-    # Combine rotations
-    R = Rz @ Ry @ Rx
-    
-    # Apply perspective affine transformation
-    pts1 = np.float32([[0, 0], [w, 0], [0, h], [w, h]])
-    
-    # Calculate perspective points
-    offset_x = 20 * np.sin(progress * np.pi * 2)
-    offset_y = 15 * np.cos(progress * np.pi * 2)
-    
-    pts2 = np.float32([
-        [offset_x, offset_y],
-        [w - offset_x * 0.5, offset_y + 5],
-        [offset_x * 0.5, h - offset_y],
-        [w - offset_x, h - offset_y + 5]
-    ])
-    
-    matrix = cv2.getPerspectiveTransform(pts1, pts2)
-    result = cv2.warpPerspective(image, matrix, (w, h))
+    matrix = perspective_matrix(progress, w, h)
+    result = cv2.warpPerspective(image, matrix, (w, h), dst=dst)
     
     return result
 
 
-def apply_camera_zoom(image: np.ndarray, progress: float, zoom_range: float = 0.2) -> np.ndarray:
+@register_effect(
+    "zoom",
+    cost_class=GEOMETRIC,
+    description="Camera zoom/dolly effect - moves forward and backward",
+    default=True,
+    params={"zoom_range": 0.15},
+    limits={"zoom_range": (0.0, 0.5)},
+    matrix=zoom_matrix,
+    order=1,
+)
+def apply_camera_zoom(
+    image: np.ndarray, progress: float, zoom_range: float = 0.2, dst: np.ndarray = None
+) -> np.ndarray:
     """
     Apply zoom/dolly effect - camera moving forward/backward.
     
@@ -79,6 +83,7 @@ def apply_camera_zoom(image: np.ndarray, progress: float, zoom_range: float = 0.
         image: Input image
         progress: Animation progress (0.0 to 1.0)
         zoom_range: Maximum zoom amount (0.2 = 20%)
+        dst: Optional output buffer
     
     Returns:
         Zoomed image
@@ -100,12 +105,24 @@ def apply_camera_zoom(image: np.ndarray, progress: float, zoom_range: float = 0.
     cropped = image[y_offset:y_offset + new_h, x_offset:x_offset + new_w]
     
     # Resize back to original size
-    result = cv2.resize(cropped, (w, h), interpolation=cv2.INTER_LINEAR)
+    result = cv2.resize(cropped, (w, h), dst=dst, interpolation=cv2.INTER_LINEAR)
     
     return result
 
 
-def apply_camera_pan(image: np.ndarray, progress: float, pan_amount: int = 30) -> np.ndarray:
+@register_effect(
+    "pan",
+    cost_class=GEOMETRIC,
+    description="Camera pan effect - moves left/right/up/down",
+    default=True,
+    params={"pan_amount": 25},
+    limits={"pan_amount": (0, 270)},
+    scaled_params=("pan_amount",),
+    matrix=pan_matrix,
+    border_mode=cv2.BORDER_REFLECT,
+    order=2,
+)
+def apply_camera_pan(image: np.ndarray, progress: float, pan_amount: int = 30, dst: np.ndarray = None) -> np.ndarray:
     """
     Apply panning effect - camera moving left/right/up/down.
     
@@ -113,238 +130,431 @@ def apply_camera_pan(image: np.ndarray, progress: float, pan_amount: int = 30) -
         image: Input image
         progress: Animation progress (0.0 to 1.0)
         pan_amount: Maximum pixel amount to pan
+        dst: Optional output buffer
     
     Returns:
         Panned image
     """
     h, w = image.shape[:2]
     
-    # Calculate pan offsets
-    pan_x = int(pan_amount * np.sin(progress * np.pi * 2))
-    pan_y = int(pan_amount * np.cos(progress * np.pi * 2))
+    # Translation matrix for the pan offsets
+    matrix = pan_matrix(progress, w, h, pan_amount)[:2]
     
-    # Create translation matrix
-    matrix = np.float32([
-        [1, 0, pan_x],
-        [0, 1, pan_y]
-    ])
-    
-    result = cv2.warpAffine(image, matrix, (w, h), borderMode=cv2.BORDER_REFLECT)
+    result = cv2.warpAffine(image, matrix, (w, h), dst=dst, borderMode=cv2.BORDER_REFLECT)
     
     return result
 
 
-def apply_rotation_3d(image: np.ndarray, progress: float) -> np.ndarray:
+@register_effect(
+    "rotation",
+    cost_class=GEOMETRIC,
+    description="Full 3D rotation - spins the image",
+    default=False,
+    matrix=rotation_matrix,
+    border_mode=cv2.BORDER_REFLECT,
+    order=3,
+)
+def apply_rotation_3d(image: np.ndarray, progress: float, dst: np.ndarray = None) -> np.ndarray:
     """
     Apply smooth 3D rotation around multiple axes.
     
     Args:
         image: Input image
         progress: Animation progress (0.0 to 1.0)
+        dst: Optional output buffer
     
     Returns:
         Rotated image
     """
     h, w = image.shape[:2]
-    center = (w // 2, h // 2)
-    
-    # Multi-axis rotation
-    angle = 360 * progress  # Full rotation
-    scale = 1.0 + 0.1 * np.sin(progress * np.pi * 2)
     
-    # Get rotation matrix
-    matrix = cv2.getRotationMatrix2D(center, angle, scale)
+    # Rotation + scale matrix
+    matrix = rotation_matrix(progress, w, h)[:2]
     
-    result = cv2.warpAffine(image, matrix, (w, h), borderMode=cv2.BORDER_REFLECT)
+    result = cv2.warpAffine(image, matrix, (w, h), dst=dst, borderMode=cv2.BORDER_REFLECT)
     
     return result
 
 
-def apply_depth_of_field(image: np.ndarray, progress: float) -> np.ndarray:
+@register_effect(
+    "depth_of_field",
+    cost_class=CONVOLUTION,
+    description="Depth of field - focus blur effect",
+    default=False,
+    params={"radius": DOF_RADIUS},
+    limits={"radius": (1, MAX_DOF_RADIUS)},
+    scaled_params=("radius",),
+    order=1,
+)
+def apply_depth_of_field(image: np.ndarray, progress: float, radius: int = DOF_RADIUS) -> np.ndarray:
     """
     Apply depth of field effect with focal blur.
     
+    Uses the calling thread's cached DepthOfFieldEngine, so the returned
+    array is reused by the next call on this thread.
+    
     Args:
         image: Input image
         progress: Animation progress (0.0 to 1.0)
+        radius: Distance in pixels from the focus point to full blur
     
     Returns:
         Image with DOF effect
     """
     h, w = image.shape[:2]
-    
-    # Create focus area mask
-    mask = np.zeros((h, w), dtype=np.float32)
-    center_x, center_y = w // 2, h // 2
-    
-    # Circular focus point that moves
-    focus_x = int(center_x + 100 * np.sin(progress * np.pi * 2))
-    focus_y = int(center_y + 100 * np.cos(progress * np.pi * 2))
-    
-    # Create gradient mask for smooth focus
-    y, x = np.ogrid[:h, :w]
-    dist = np.sqrt((x - focus_x)**2 + (y - focus_y)**2)
-    mask = 1.0 - np.clip(dist / 200, 0, 1)
-    
-    # Apply selective blur
-    blurred = cv2.GaussianBlur(image, (21, 21), 5)
-    
-    # Blend focused and blurred
-    result = np.zeros_like(image, dtype=np.float32)
-    for c in range(image.shape[2]):
-        result[:, :, c] = image[:, :, c] * mask + blurred[:, :, c] * (1 - mask)
-    
-    return np.clip(result, 0, 255).astype(np.uint8)
+    return get_dof_engine((w, h), radius).apply(image, progress)
 
 
-def apply_motion_blur(image: np.ndarray, progress: float) -> np.ndarray:
+@register_effect(
+    "motion_blur",
+    cost_class=CONVOLUTION,
+    description="Cinematic motion blur - smears along the camera motion",
+    default=True,
+    params={
+        "shutter": MOTION_SHUTTER,
+        "max_length": MAX_BLUR_LENGTH,
+        "samples": MOTION_SAMPLES,
+        "subframe_scale": SUBFRAME_SCALE,
+    },
+    limits={
+        "shutter": (0.0, 1.0),
+        "max_length": (0, 255),
+        "samples": (0, MAX_SUBFRAMES),
+        "subframe_scale": (MIN_SUBFRAME_SCALE, 1.0),
+    },
+    scaled_params=("max_length",),
+    motion=True,
+    order=0,
+)
+def apply_motion_blur(
+    image: np.ndarray,
+    progress: float,
+    motion: np.ndarray = None,
+    shutter: float = MOTION_SHUTTER,
+    max_length: int = MAX_BLUR_LENGTH,
+    samples: int = MOTION_SAMPLES,
+    subframe_scale: float = SUBFRAME_SCALE,
+    dst: np.ndarray = None
+) -> np.ndarray:
     """
-    Apply subtle motion blur for cinematic effect.
+    Apply directional motion blur following the camera motion.
+    
+    With samples >= 2 the pipeline renders accumulated sub-frames in the
+    warp instead of calling this (see services.motion_blur).
     
     Args:
         image: Input image
         progress: Animation progress (0.0 to 1.0)
+        motion: Per-tile on-screen velocity of this frame, supplied by the
+            pipeline from the geometric effects; without it nothing moves
+        shutter: Fraction of the frame interval the shutter is open
+        max_length: Longest blur in pixels
+        samples: Sub-frames to accumulate instead (2 to 16)
+        subframe_scale: Resolution of accumulated sub-frames (0 to 1)
+        dst: Optional output buffer
     
     Returns:
-        Image with motion blur
+        Image with motion blur (see services.motion_blur)
     """
-    # Motion blur intensity varies with progress
-    intensity = int(3 + 7 * abs(np.sin(progress * np.pi * 2)))
-    
-    if intensity > 1:
-        # Create motion blur kernel
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (intensity, intensity))
-        result = cv2.filter2D(image, -1, kernel / kernel.sum())
-    else:
-        result = image
+    if motion is None:
+        return image
     
-    return result
+    return blur_along_motion(image, motion, shutter, max_length, dst)
 
 
-def apply_chromatic_aberration(image: np.ndarray, progress: float) -> np.ndarray:
+@register_effect(
+    "chromatic_aberration",
+    cost_class=PER_CHANNEL,
+    description="RGB channel separation - sci-fi effect",
+    default=False,
+    params={"max_shift": CA_MAX_SHIFT, "mode": "shift"},
+    limits={"max_shift": (0, 100)},
+    scaled_params=("max_shift",),
+    choices={"mode": CA_MODES},
+)
+def apply_chromatic_aberration(
+    image: np.ndarray,
+    progress: float,
+    max_shift: int = CA_MAX_SHIFT,
+    mode: str = "shift",
+    dst: np.ndarray = None
+) -> np.ndarray:
     """
     Apply chromatic aberration (RGB channel separation) effect.
     
     Args:
         image: Input image
         progress: Animation progress (0.0 to 1.0)
+        max_shift: Maximum channel offset in pixels
+        mode: "shift" (pulsing sideways separation) or "radial" (lens-style,
+            growing towards the corners; see services.chromatic_aberration)
+        dst: Optional output buffer
     
     Returns:
         Image with chromatic aberration
     """
-    h, w = image.shape[:2]
+    if mode == "radial":
+        return radial_aberration(image, max_shift, dst)
     
     # Shift amount increases and decreases
-    shift = int(5 * abs(np.sin(progress * np.pi * 2)))
+    shift = int(max_shift * abs(np.sin(progress * np.pi * 2)))
     
-    if shift > 0:
-        # Split channels
-        r, g, b = cv2.split(image)
-        
-        # Shift red channel
-        matrix_r = np.float32([[1, 0, shift], [0, 1, 0]])
-        r = cv2.warpAffine(r, matrix_r, (w, h))
-        
-        # Shift blue channel
-        matrix_b = np.float32([[1, 0, -shift], [0, 1, 0]])
-        b = cv2.warpAffine(b, matrix_b, (w, h))
-        
-        result = cv2.merge([r, g, b])
-    else:
-        result = image
+    return shift_channels(image, shift, dst)
+
+
+DEFAULT_EFFECTS = {
+    'zoom': True,
+    'pan': True,
+    'rotation': False,
+    'perspective': True,
+    'depth_of_field': False,
+    'motion_blur': True,
+    'chromatic_aberration': False
+}
+
+
+def load_source_images(
+    image1_path: Path,
+    image2_path: Path,
+    size: tuple[int, int] = RESOLUTION,
+    hashes: tuple[str, str] | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Load both source images resized to the output size.
     
-    return result
+    Args:
+        image1_path: Path to initial image
+        image2_path: Path to final image
+        size: Output (width, height)
+        hashes: SHA-256 of both images if already known (e.g. from the
+            upload), so the cache lookup doesn't re-read the files
+    
+    Returns:
+        (arr1, arr2) as read-only BGR uint8 arrays at size
+    """
+    # Draft-mode decode, EXIF orientation and alpha handling live in
+    # image_loader; repeated images come from its in-memory cache
+    return tuple(load_sources([image1_path, image2_path], size, hashes))
+
+
+def load_sources(
+    image_paths: list[Path],
+    size: tuple[int, int],
+    hashes: list[str] | None = None
+) -> list[np.ndarray]:
+    """Load every source image at size, passing known hashes to the loader."""
+    if hashes is None:
+        hashes = [None] * len(image_paths)
+    elif len(hashes) != len(image_paths):
+        raise ValueError(f"Expected {len(image_paths)} image hashes, got {len(hashes)}")
+    return [load_image(path, size, sha256) for path, sha256 in zip(image_paths, hashes)]
+
+
+def render_3d_frame(
+    arr1: np.ndarray,
+    arr2: np.ndarray,
+    index: int,
+    frame_count: int,
+    effects: dict,
+    out: np.ndarray = None
+) -> np.ndarray:
+    """
+    Render a single transition frame.
+    
+    Depends only on the two source images and the frame index, so frames
+    can be rendered independently and in any order. Effects run through
+    the pipeline built by services.effect_registry, which applies all
+    geometric effects in one warp. Intermediate frames live in this
+    thread's preallocated buffers (services.frame_buffers).
+    
+    Args:
+        arr1: Initial image (BGR)
+        arr2: Final image (BGR)
+        index: Frame index
+        frame_count: Total number of frames
+        effects: Dictionary of effect settings
+        out: Optional RGB output buffer (a new array is returned otherwise)
+    
+    Returns:
+        RGB frame
+    """
+    progress = index / (frame_count - 1)
+    h, w = arr1.shape[:2]
+    buffers = get_frame_buffers((w, h))
+    
+    # Start with blended base (uint8 in, uint8 out: no float frame)
+    alpha = progress
+    with timed("blend"):
+        frame = cv2.addWeighted(arr1, 1 - alpha, arr2, alpha, 0, dst=buffers.blend)
+    
+    # Apply 3D effects
+    pipeline = build_pipeline(effects, frame_count, (w, h))
+    frame = pipeline.render(frame, index, frame_count, buffers)
+    
+    # Convert back to RGB for the encoder
+    with timed("color_convert"):
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+
+
+def iter_3d_transition_frames(
+    image1_path: Path,
+    image2_path: Path,
+    effects: dict = None,
+    profile: RenderProfile = DEFAULT_PROFILE,
+    hashes: tuple[str, str] | None = None
+) -> Iterator[np.ndarray]:
+    """
+    Yield transition frames with 3D effects and camera movements.
+    
+    Frames are produced one at a time as RGB uint8 arrays so they can be
+    piped straight into an encoder without touching the disk. They come
+    from a ring of FRAME_RING_SIZE buffers: copy any frame you keep.
+    
+    Args:
+        image1_path: Path to initial image
+        image2_path: Path to final image
+        effects: Dictionary of effect settings (see generate_3d_transition_frames)
+        profile: Output size and frame count
+        hashes: SHA-256 of both images if already known
+    
+    Yields:
+        RGB frames as numpy arrays at the profile's size
+    """
+    # Default effects enabled
+    if effects is None:
+        effects = DEFAULT_EFFECTS
+    
+    yield from iter_sequence_frames([image1_path, image2_path], [effects], profile, hashes)
+
+
+def sequence_frames(segment_count: int, frame_count: int) -> Iterator[tuple[int, int]]:
+    """
+    (segment, index) of every frame of a sequence, in order.
+    
+    Segments after the first skip index 0: it shows the same source image
+    as the previous segment's last frame and would stutter.
+    """
+    for segment in range(segment_count):
+        for index in range(1 if segment else 0, frame_count):
+            yield segment, index
+
+
+def render_frames_into(
+    sources: list[np.ndarray],
+    frames: list[tuple[int, int]],
+    frame_count: int,
+    segment_effects: list[dict],
+    out: np.ndarray
+) -> np.ndarray:
+    """
+    Render several frames of a sequence into consecutive rows of out.
+    
+    Each frame still goes through render_3d_frame on its own; this only
+    lets a parallel render task fill a whole (K, H, W, 3) dispatch block
+    in one call. Blending K frames as one NumPy broadcast was measured
+    several times slower than K cv2.addWeighted calls, so frames are not
+    vectorised across the block.
+    
+    Args:
+        sources: Source images (BGR) of the sequence
+        frames: (segment, index) pairs as produced by sequence_frames
+        frame_count: Frames per segment
+        segment_effects: Effect settings for each segment
+        out: (K, H, W, 3) RGB array with K >= len(frames)
+    
+    Returns:
+        The rendered rows of out
+    """
+    for row, (segment, index) in zip(out, frames):
+        render_3d_frame(
+            sources[segment], sources[segment + 1], index, frame_count, segment_effects[segment],
+            out=row
+        )
+    return out[:len(frames)]
+
+
+def iter_sequence_frames(
+    image_paths: list[Path],
+    segment_effects: list[dict],
+    profile: RenderProfile = DEFAULT_PROFILE,
+    hashes: list[str] | None = None
+) -> Iterator[np.ndarray]:
+    """
+    Yield the frames of an A -> B -> C ... sequence as one stream.
+    
+    Each source is decoded once however many segments it takes part in,
+    and every segment is one transition of profile.frame_count frames.
+    Frames are written into a FrameRing: each stays valid until
+    FRAME_RING_SIZE more frames have been yielded.
+    
+    Args:
+        image_paths: Two or more source images, in order
+        segment_effects: Effect settings for each of the len(image_paths) - 1 segments
+        profile: Output size and frame count per segment
+        hashes: SHA-256 of every image if already known (e.g. from the
+            uploads), so the source cache lookup doesn't re-hash the files
+    
+    Yields:
+        RGB frames as numpy arrays at the profile's size
+    """
+    if len(image_paths) < 2:
+        raise ValueError("A sequence needs at least two images")
+    if len(segment_effects) != len(image_paths) - 1:
+        raise ValueError(f"Expected effects for {len(image_paths) - 1} segments, got {len(segment_effects)}")
+    
+    with timed("decode"):
+        sources = load_sources(image_paths, profile.size, hashes)
+    
+    ring = FrameRing(profile.size)
+    for segment, i in sequence_frames(len(segment_effects), profile.frame_count):
+        yield render_3d_frame(
+            sources[segment], sources[segment + 1], i, profile.frame_count, segment_effects[segment],
+            out=ring.next()
+        )
 
 
 def generate_3d_transition_frames(
     image1_path: Path, 
     image2_path: Path, 
     output_dir: Path,
-    effects: dict = None
+    effects: dict = None,
+    profile: RenderProfile = DEFAULT_PROFILE,
+    hashes: tuple[str, str] | None = None
 ) -> list[Path]:
     """
-    Generate transition frames with 3D effects and camera movements.
+    Generate transition frames with 3D effects and save them as PNG files.
+    
+    Only used for debugging (see DEBUG_SAVE_FRAMES); the normal pipeline
+    streams frames from iter_3d_transition_frames into the encoder.
     
     Args:
         image1_path: Path to initial image
         image2_path: Path to final image
         output_dir: Directory to save frames
-        effects: Dictionary of effect settings
+        effects: Dictionary of effect settings; each value is a bool or
+            a dict of parameter overrides (see services.effect_registry)
             {
-                'zoom': bool,
-                'pan': bool,
+                'zoom': bool | {'zoom_range': float},
+                'pan': bool | {'pan_amount': int},
                 'rotation': bool,
                 'perspective': bool,
-                'depth_of_field': bool,
-                'motion_blur': bool,
-                'chromatic_aberration': bool
+                'depth_of_field': bool | {'radius': int},
+                'motion_blur': bool | {'shutter': float, 'max_length': int,
+                                       'samples': int, 'subframe_scale': float},
+                'chromatic_aberration': bool | {'max_shift': int, 'mode': 'shift' | 'radial'}
             }
+            Pixel parameters are at 1080p and scale with the profile.
+        profile: Output size and frame count
+        hashes: SHA-256 of both images if already known
     
     Returns:
         List of paths to generated frames
     """
-    # Default effects enabled
-    if effects is None:
-        effects = {
-            'zoom': True,
-            'pan': True,
-            'rotation': False,
-            'perspective': True,
-            'depth_of_field': False,
-            'motion_blur': True,
-            'chromatic_aberration': False
-        }
-    
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Load images
-    img1 = Image.open(image1_path)
-    img2 = Image.open(image2_path)
-    
-    # Resize to same dimensions
-    size = (1080, 1080)
-    img1 = img1.resize(size, Image.Resampling.LANCZOS)
-    img2 = img2.resize(size, Image.Resampling.LANCZOS)
-    
-    # Convert to OpenCV format (BGR)
-    arr1 = cv2.cvtColor(np.array(img1), cv2.COLOR_RGB2BGR)
-    arr2 = cv2.cvtColor(np.array(img2), cv2.COLOR_RGB2BGR)
-    
     frame_paths = []
     
-    for i in range(FRAME_COUNT):
-        progress = i / (FRAME_COUNT - 1)
-        
-        # Start with blended base
-        alpha = progress
-        blended = cv2.addWeighted(arr1, 1 - alpha, arr2, alpha, 0).astype(np.uint8)
-        
-        # Apply 3D effects
-        frame = blended.astype(np.uint8)
-        
-        if effects.get('perspective', True):
-            frame = apply_perspective_transform(frame, progress)
-        
-        if effects.get('zoom', True):
-            frame = apply_camera_zoom(frame, progress, zoom_range=0.15)
-        
-        if effects.get('pan', True):
-            frame = apply_camera_pan(frame, progress, pan_amount=25)
-        
-        if effects.get('rotation', False):
-            frame = apply_rotation_3d(frame, progress)
-        
-        if effects.get('motion_blur', True):
-            frame = apply_motion_blur(frame, progress)
-        
-        if effects.get('depth_of_field', False):
-            frame = apply_depth_of_field(frame, progress)
-        
-        if effects.get('chromatic_aberration', False):
-            frame = apply_chromatic_aberration(frame, progress)
-        
-        # Convert back to RGB for PIL
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    for i, frame_rgb in enumerate(iter_3d_transition_frames(image1_path, image2_path, effects, profile, hashes)):
         frame_pil = Image.fromarray(frame_rgb)
         
         # Save frame
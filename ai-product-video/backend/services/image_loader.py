@@ -0,0 +1,142 @@
+"""Fast ingest of source images.
+
+Product photos are often far larger than the output frame. For JPEGs the
+decoder is put in draft mode so libjpeg's DCT scaling decodes at 1/2, 1/4
+or 1/8 size (the smallest that is still at least the target size) before
+the final LANCZOS resize. EXIF orientation is applied, transparent images
+are flattened onto white and greyscale/CMYK/palette images are converted
+to RGB explicitly, so every source reaches OpenCV as 3-channel BGR.
+
+Sources keep their aspect ratio: an image whose shape differs from the
+output (a square photo in a 9:16 video) is scaled to fit inside it and
+letterboxed onto white, the same background transparent products get,
+rather than stretched. The whole product stays in frame.
+
+Normalized arrays are cached in memory by content hash and target size,
+so repeated pairs (and images shared between pairs) skip decoding.
+Callers that already know a file's hash (uploads are hashed while they
+are saved) pass it in, so a cache hit doesn't read the file at all.
+"""
+from collections import OrderedDict
+from pathlib import Path
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from config import SOURCE_CACHE_MAX_BYTES
+from utils.file_manager import file_sha256
+
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION = 0x0112
+
+_cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """Convert any PIL mode to RGB, compositing transparency onto white."""
+    if img.mode == "RGB":
+        return img
+    if img.mode == "P":
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    if img.mode in ("RGBA", "LA", "RGBa", "La", "PA"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    if img.mode in ("I;16", "I;16B", "I;16L", "I"):
+        # 16/32-bit greyscale: scale to 8 bits before converting
+        arr = np.asarray(img, dtype=np.float32)
+        peak = float(arr.max()) or 1.0
+        img = Image.fromarray(np.clip(arr * (255.0 / peak), 0, 255).astype(np.uint8), mode="L")
+    return img.convert("RGB")
+
+
+def fit_size(image_size: tuple[int, int], size: tuple[int, int]) -> tuple[int, int]:
+    """Largest (width, height) with image_size's aspect ratio that fits in size."""
+    scale = min(size[0] / image_size[0], size[1] / image_size[1])
+    return (
+        min(max(round(image_size[0] * scale), 1), size[0]),
+        min(max(round(image_size[1] * scale), 1), size[1]),
+    )
+
+
+def decode_image(path: Path, size: tuple[int, int]) -> np.ndarray:
+    """
+    Decode and normalize an image to size, letterboxed to keep its aspect ratio.
+
+    Args:
+        path: Image file
+        size: Target (width, height)
+
+    Returns:
+        BGR uint8 array of shape (height, width, 3)
+    """
+    size = tuple(size)
+    with Image.open(path) as img:
+        orientation = img.getexif().get(_EXIF_ORIENTATION, 1)
+        transposed = orientation in _TRANSPOSED_ORIENTATIONS
+        upright = (img.height, img.width) if transposed else img.size
+        fit = fit_size(upright, size)
+
+        if img.format == "JPEG":
+            # DCT scaling: decode at the smallest scale still >= the fitted size
+            img.draft("RGB", (fit[1], fit[0]) if transposed else fit)
+
+        img = ImageOps.exif_transpose(img)
+        img = _flatten(img)
+        if img.size != fit:
+            img = img.resize(fit, Image.Resampling.LANCZOS)
+        if fit != size:
+            canvas = Image.new("RGB", size, (255, 255, 255))
+            canvas.paste(img, ((size[0] - fit[0]) // 2, (size[1] - fit[1]) // 2))
+            img = canvas
+
+        return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+
+
+def clear_cache() -> None:
+    """Drop every cached source image."""
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def load_image(path: Path, size: tuple[int, int], sha256: str | None = None) -> np.ndarray:
+    """
+    Load a normalized source image, using the in-memory cache when possible.
+
+    Args:
+        path: Image file
+        size: Target (width, height)
+        sha256: Content hash if already known (computed from the file otherwise)
+
+    Returns:
+        Read-only BGR uint8 array of shape (height, width, 3)
+    """
+    global _cache_bytes
+    key = (sha256 or file_sha256(path), tuple(size))
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    arr = decode_image(path, size)
+    arr.setflags(write=False)
+
+    if arr.nbytes <= SOURCE_CACHE_MAX_BYTES:
+        with _cache_lock:
+            if key not in _cache:
+                _cache[key] = arr
+                _cache_bytes += arr.nbytes
+            while _cache_bytes > SOURCE_CACHE_MAX_BYTES and _cache:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= evicted.nbytes
+    return arr
@@ -0,0 +1,318 @@
+"""Background render jobs.
+
+Renders are CPU-bound and must not run on the uvicorn event loop. The
+JobManager runs them on a bounded worker pool and keeps a small in-memory
+record of each job so clients can poll for status and fetch the video.
+
+Backpressure: at most RENDER_WORKERS jobs render at once and at most
+MAX_QUEUED_JOBS more may wait. Beyond that submit() raises QueueFullError,
+which the API turns into a 503 with a Retry-After header. Bulk producers
+(batches) call wait_for_capacity() first so they only use part of the queue.
+
+Previews (submit_preview) are short renders whose result goes straight
+back to the client, so they get no job record, but they run on their own
+pool of PREVIEW_WORKERS threads with at most MAX_QUEUED_PREVIEWS waiting,
+and raise QueueFullError beyond that like renders do.
+
+External provider jobs mostly wait on the network, so they run as asyncio
+tasks on the event loop (submit_async) with their own, much larger limit
+(MAX_PROVIDER_JOBS) and don't occupy render workers.
+
+Live renders also write an HLS playlist into the job's live_dir while
+they run; that directory is removed when the job record is pruned, while
+the finished MP4 stays in OUTPUT_DIR.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+import asyncio
+import logging
+import shutil
+import threading
+import time
+import uuid
+
+from config import (
+    JOB_RESULT_TTL,
+    MAX_PROVIDER_JOBS,
+    MAX_QUEUED_JOBS,
+    MAX_QUEUED_PREVIEWS,
+    PREVIEW_WORKERS,
+    RENDER_WORKERS,
+)
+from services.metrics import JOB_QUEUE_SECONDS, JOB_SECONDS, JOBS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the render queue is at capacity."""
+
+
+RENDER = "render"
+PROVIDER = "provider"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str = RENDER
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    output_path: Path | None = None
+    live_dir: Path | None = None
+    error: str | None = None
+    future: Future | None = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Bounded worker pool plus an in-memory job table."""
+
+    def __init__(
+        self,
+        workers: int = RENDER_WORKERS,
+        max_queued: int = MAX_QUEUED_JOBS,
+        result_ttl: float = JOB_RESULT_TTL,
+        max_async: int = MAX_PROVIDER_JOBS,
+        preview_workers: int = PREVIEW_WORKERS,
+        max_queued_previews: int = MAX_QUEUED_PREVIEWS
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_async = max_async
+        self.preview_workers = preview_workers
+        self.max_queued_previews = max_queued_previews
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._preview_executor = ThreadPoolExecutor(max_workers=preview_workers, thread_name_prefix="preview")
+        self._previews = 0
+        # The event loop only keeps weak references to tasks
+        self._tasks: set[asyncio.Task] = set()
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._job_done = threading.Condition(self._lock)
+
+    def submit(
+        self,
+        fn: Callable[[], Path],
+        job_id: str | None = None,
+        on_finish: Callable[[Job], None] | None = None,
+        live_dir: Path | None = None
+    ) -> Job:
+        """
+        Queue a render.
+
+        Args:
+            fn: Zero-argument callable that renders and returns the output path
+            job_id: Optional id to use for the job (a new one is generated otherwise)
+            on_finish: Optional callback run in the worker after fn, success or not
+            live_dir: Directory fn writes a live playlist to (removed when the job is pruned)
+
+        Returns:
+            The queued Job
+
+        Raises:
+            QueueFullError: If all workers are busy and the queue is full
+        """
+        with self._lock:
+            self._prune()
+            if self.in_flight() >= self.workers + self.max_queued:
+                raise QueueFullError(
+                    f"Render queue is full ({self.workers} running, {self.max_queued} queued)"
+                )
+            job = Job(id=job_id or uuid.uuid4().hex, live_dir=live_dir)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, fn, on_finish)
+        return job
+
+    def submit_async(
+        self,
+        fn: Callable[[], Awaitable[Path]],
+        job_id: str | None = None,
+        on_finish: Callable[[Job], None] | None = None
+    ) -> Job:
+        """
+        Run a coroutine job (e.g. an external provider call) on the event loop.
+
+        Must be called from the running event loop.
+
+        Raises:
+            QueueFullError: If MAX_PROVIDER_JOBS provider jobs are already in flight
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._prune()
+            if self.in_flight(PROVIDER) >= self.max_async:
+                raise QueueFullError(f"Too many provider jobs in flight ({self.max_async})")
+            job = Job(id=job_id or uuid.uuid4().hex, kind=PROVIDER)
+            job.future = Future()
+            self._jobs[job.id] = job
+        task = loop.create_task(self._run_async(job, fn, on_finish))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def submit_preview(self, fn: Callable[[], Any]) -> Future:
+        """
+        Run a preview render on the preview pool.
+
+        Args:
+            fn: Zero-argument callable that renders the preview
+
+        Returns:
+            Future of fn's result (await it with asyncio.wrap_future)
+
+        Raises:
+            QueueFullError: If all preview workers are busy and the preview queue is full
+        """
+        with self._lock:
+            if self._previews >= self.preview_workers + self.max_queued_previews:
+                raise QueueFullError(
+                    f"Preview queue is full ({self.preview_workers} running, {self.max_queued_previews} queued)"
+                )
+            self._previews += 1
+            future = self._preview_executor.submit(fn)
+        future.add_done_callback(self._preview_done)
+        return future
+
+    def add_finished(self, output_path: Path, job_id: str | None = None) -> Job:
+        """Record a job whose output already exists (e.g. a cache hit)."""
+        with self._lock:
+            self._prune()
+            now = time.time()
+            job = Job(
+                id=job_id or uuid.uuid4().hex,
+                status=SUCCEEDED,
+                started_at=now,
+                finished_at=now,
+                output_path=Path(output_path),
+            )
+            job.future = Future()
+            job.future.set_result(job.output_path)
+            self._jobs[job.id] = job
+        return job
+
+    def wait_for_capacity(self, limit: int, timeout: float | None = None) -> bool:
+        """
+        Block until fewer than limit render jobs are queued or running.
+
+        Returns:
+            False if timeout expired first
+        """
+        with self._job_done:
+            return self._job_done.wait_for(lambda: self.in_flight() < limit, timeout)
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def in_flight(self, kind: str = RENDER) -> int:
+        return sum(1 for j in self._jobs.values() if j.kind == kind and j.status in (QUEUED, RUNNING))
+
+    def stats(self) -> dict:
+        jobs = list(self._jobs.values())
+        queued = sum(1 for j in jobs if j.kind == RENDER and j.status == QUEUED)
+        running = sum(1 for j in jobs if j.kind == RENDER and j.status == RUNNING)
+        provider = sum(1 for j in jobs if j.kind == PROVIDER and j.status in (QUEUED, RUNNING))
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": queued,
+            "running": running,
+            "provider_in_flight": provider,
+            "max_provider_jobs": self.max_async,
+            "previews_in_flight": self._previews,
+            "preview_workers": self.preview_workers,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._preview_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _preview_done(self, future: Future) -> None:
+        with self._lock:
+            self._previews -= 1
+
+    def _run(self, job: Job, fn: Callable[[], Path], on_finish: Callable[[Job], None] | None) -> Path | None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        JOB_QUEUE_SECONDS.observe(job.started_at - job.created_at)
+        try:
+            job.output_path = Path(fn())
+            job.status = SUCCEEDED
+            return job.output_path
+        except Exception as e:
+            logger.error(f"Render job {job.id} failed: {e}")
+            job.error = getattr(e, "detail", None) or str(e)
+            job.status = FAILED
+            raise
+        finally:
+            job.finished_at = time.time()
+            JOB_SECONDS.observe(job.finished_at - job.started_at, status=job.status)
+            JOBS_TOTAL.inc(status=job.status)
+            with self._job_done:
+                self._job_done.notify_all()
+            if on_finish is not None:
+                try:
+                    on_finish(job)
+                except Exception as e:
+                    logger.warning(f"Error in finish callback for job {job.id}: {e}")
+
+    async def _run_async(self, job: Job, fn: Callable[[], Awaitable[Path]], on_finish: Callable[[Job], None] | None) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.output_path = Path(await fn())
+            job.status = SUCCEEDED
+            job.future.set_result(job.output_path)
+        except asyncio.CancelledError:
+            # Shutdown or loop teardown: don't leave the job running forever
+            logger.warning(f"Provider job {job.id} was cancelled")
+            job.error = "Job was cancelled"
+            job.status = FAILED
+            job.future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Provider job {job.id} failed: {e}")
+            job.error = getattr(e, "detail", None) or str(e)
+            job.status = FAILED
+            job.future.set_exception(e)
+        finally:
+            job.finished_at = time.time()
+            JOB_SECONDS.observe(job.finished_at - job.started_at, status=job.status)
+            JOBS_TOTAL.inc(status=job.status)
+            if on_finish is not None:
+                try:
+                    on_finish(job)
+                except Exception as e:
+                    logger.warning(f"Error in finish callback for job {job.id}: {e}")
+
+    def _prune(self) -> None:
+        # Forget finished jobs after result_ttl; their videos stay in OUTPUT_DIR
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, j in self._jobs.items()
+            if j.finished_at is not None and j.finished_at < cutoff
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if job.live_dir is not None:
+                shutil.rmtree(job.live_dir, ignore_errors=True)
@@ -0,0 +1,216 @@
+"""Hot-path timing metrics in Prometheus text format.
+
+A deliberately small, dependency-free subset of the Prometheus client:
+labelled counters and histograms, plus gauges and counters that are
+read from a callback at scrape time. Hot paths wrap their work in `timed()`:
+
+    with timed("decode"):
+        arr1, arr2 = load_source_images(...)
+
+Timings recorded inside the parallel render worker processes stay in
+those processes; with RENDER_PROCESSES > 1 the per-effect stages are
+only visible as the overall frame timings in the API process.
+"""
+from contextlib import contextmanager
+from typing import Callable
+import bisect
+import threading
+import time
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., count, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                entry[index] += 1
+            entry[-2] += 1
+            entry[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict[tuple, tuple[int, float]]:
+        """(count, sum) for every label combination."""
+        with self._lock:
+            return {key: (entry[-2], entry[-1]) for key, entry in self._values.items()}
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(entry)) for key, entry in self._values.items())
+        lines = self.header()
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {entry[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {entry[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(entry[-1])}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Gauge (or counter) whose labelled values come from a callback at scrape time."""
+
+    def __init__(self, name, documentation, labelnames=(), callback: Callable[[], dict] | None = None, kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> list[str]:
+        if self.callback is None:
+            return []
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = self.header()
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+_metrics: dict[str, _Metric] = {}
+
+
+def _register(metric: _Metric) -> _Metric:
+    _metrics[metric.name] = metric
+    return metric
+
+
+def register_callback(
+    name: str,
+    documentation: str,
+    callback: Callable[[], dict],
+    labelnames: tuple = (),
+    kind: str = "gauge"
+) -> CallbackMetric:
+    """
+    Expose values computed at scrape time; re-registering replaces them.
+
+    The callback returns a number, or a dict mapping label value tuples
+    to numbers.
+    """
+    return _register(CallbackMetric(name, documentation, labelnames, callback, kind))
+
+
+STAGE_SECONDS = _register(Histogram(
+    "render_stage_seconds",
+    "Time spent in each render hot-path stage.",
+    ("stage",),
+))
+
+PROVIDER_SECONDS = _register(Histogram(
+    "provider_request_seconds",
+    "Duration of external provider calls.",
+    ("provider", "outcome"),
+))
+
+JOB_SECONDS = _register(Histogram(
+    "render_job_seconds",
+    "Time from job start to finish.",
+    ("status",),
+))
+
+JOB_QUEUE_SECONDS = _register(Histogram(
+    "render_job_queue_seconds",
+    "Time jobs spend waiting for a worker.",
+))
+
+JOBS_TOTAL = _register(Counter(
+    "render_jobs_total",
+    "Finished render jobs by status.",
+    ("status",),
+))
+
+
+def timed(stage: str):
+    """Context manager recording the duration of a hot-path stage."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
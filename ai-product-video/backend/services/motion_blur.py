@@ -0,0 +1,309 @@
+"""Directional motion blur.
+
+The blur follows the camera: services.transform_plan's motion plan gives
+the content's on-screen velocity at the centre of each tile of a grid,
+and each tile is convolved with a line kernel along that velocity, as
+long as the distance the content travels while the shutter is open:
+
+    length = shutter * speed    (shutter 0.5 is a 180 degree shutter)
+
+A pan blurs every tile the same way, a zoom blurs radially and a
+rotation tangentially; a frame that doesn't move is left sharp.
+
+Kernels are anti-aliased lines cropped to their extent, so filter2D only
+visits the ~2 * length taps on the line instead of a length x length square
+(axis-aligned lines are plain 1xL / Lx1 rows). They are cached per
+(length, angle) with the angle quantised to ANGLE_STEP degrees. OpenCV
+switches filter2D to a DFT once a kernel has 130 or more elements, which
+is several times slower on a 1080p frame, so lines whose kernel would
+be that large are applied as repeated shorter passes with the same
+combined spread (variance) as the full line.
+
+Accumulated (temporal) motion blur is the premium alternative: the warp
+is rendered at `samples` instants while the shutter is open (see
+transform_plan.build_subframe_plan) and averaged, which follows any
+motion exactly, where line kernels only approximate zoom and rotation
+tile by tile. Sub-frames are warped from a downscaled source into one
+(samples, h, w, 3) batch and summed in a single vectorised reduction.
+Only the difference between their mean and the centre sub-frame is
+upsampled and added to a full resolution warp of the frame, so whatever
+doesn't move stays sharp. subframe_scale trades the resolution of that
+difference for speed and samples trade ghosting for speed; memory is
+samples * subframe_scale^2 frames per accumulator. subframe_scale is
+rounded to SUBFRAME_SCALE_STEP and each render thread keeps only its
+SUBFRAME_CACHE_SIZE most recently used accumulators.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+import math
+import threading
+
+import cv2
+import numpy as np
+
+ANGLE_STEP = 5            # Degrees between cached kernel orientations
+KERNEL_AREA_LIMIT = 130   # filter2D uses a DFT from this many kernel elements
+MIN_LENGTH = 2            # Shorter blurs are not worth a pass
+MOTION_SHUTTER = 0.5      # Fraction of the frame interval the shutter is open
+MAX_BLUR_LENGTH = 31      # Pixels at 1080p
+MOTION_SAMPLES = 0        # Sub-frames to accumulate (below 2: line kernels instead)
+MAX_SUBFRAMES = 16
+SUBFRAME_SCALE = 0.5      # Resolution of the sub-frames relative to the frame
+MIN_SUBFRAME_SCALE = 0.1
+SUBFRAME_SCALE_STEP = 0.05
+SUBFRAME_CACHE_SIZE = 2   # Accumulators kept per thread
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=1024)
+def line_kernel(length: int, angle: int) -> np.ndarray:
+    """
+    Normalised line kernel centred on its anchor.
+
+    Drawn like an anti-aliased (Wu) line: one column of two taps per step
+    along the major axis, so a line costs about 2 * length taps.
+
+    Args:
+        length: Line length in pixels
+        angle: Direction in degrees (0 is horizontal, y points down)
+
+    Returns:
+        float32 kernel cropped to the line's (symmetric) extent
+    """
+    theta = math.radians(angle)
+    cos, sin = math.cos(theta), math.sin(theta)
+    steep = abs(sin) > abs(cos)
+    major, minor = (sin, cos) if steep else (cos, sin)
+
+    # Steps covering the line's extent along the major axis; the end
+    # steps are partially covered
+    half = (length - 1) / 2 * abs(major)
+    reach = math.ceil(half)
+    u = np.arange(-reach - 1, reach + 2)
+    weight = np.clip(half + 1 - np.abs(u), 0, 1)
+    v = u * (minor / major)
+    v0 = np.floor(v).astype(int)
+    frac = v - v0
+
+    extent = reach + 2 + int(np.abs(v0).max())
+    side = 2 * extent + 1
+    kernel = np.zeros((side, side), dtype=np.float64)
+    cols, rows = u + extent, v0 + extent
+    if steep:
+        cols, rows = rows, cols
+    np.add.at(kernel, (rows, cols), weight * (1 - frac))
+    np.add.at(kernel, (rows + 1, cols) if not steep else (rows, cols + 1), weight * frac)
+
+    # Drop negligible taps (filter2D pays for every nonzero one)
+    kernel[kernel < kernel.max() * 1e-3] = 0
+    nz_rows, nz_cols = np.nonzero(kernel)
+    ry = int(np.abs(nz_rows - extent).max())
+    rx = int(np.abs(nz_cols - extent).max())
+    kernel = kernel[extent - ry:extent + ry + 1, extent - rx:extent + rx + 1]
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+@lru_cache(maxsize=1024)
+def motion_kernels(length: int, angle: int) -> tuple[np.ndarray, ...]:
+    """
+    Kernels to apply in sequence for a blur of the given length and angle.
+
+    A single line when it stays under OpenCV's DFT threshold, otherwise
+    the fewest equal shorter lines that do: n passes of a line of length
+    s have the variance n * (s^2 - 1) / 12 of one line of length
+    sqrt(n * (s^2 - 1) + 1).
+    """
+    count = 1
+    while True:
+        pass_length = int(round(math.sqrt((length * length - 1) / count + 1)))
+        kernel = line_kernel(pass_length, angle)
+        if kernel.size < KERNEL_AREA_LIMIT or pass_length <= MIN_LENGTH:
+            return (kernel,) * count
+        count += 1
+
+
+def _kernel_key(velocity: np.ndarray, shutter: float, max_length: int) -> tuple[int, int] | None:
+    dx, dy = float(velocity[0]), float(velocity[1])
+    length = min(int(round(shutter * math.hypot(dx, dy))), max_length)
+    if length < MIN_LENGTH:
+        return None
+    # A line is symmetric, so only the orientation mod 180 matters
+    angle = int(round(math.degrees(math.atan2(dy, dx)) / ANGLE_STEP)) * ANGLE_STEP % 180
+    return length, angle
+
+
+def _scratch(h: int, w: int) -> np.ndarray:
+    """This thread's tile buffer, viewed at (h, w)."""
+    buffer = getattr(_local, "scratch", None)
+    if buffer is None or buffer.shape[0] < h or buffer.shape[1] < w:
+        shape = (h, w) if buffer is None else (max(h, buffer.shape[0]), max(w, buffer.shape[1]))
+        buffer = _local.scratch = np.empty((*shape, 3), dtype=np.uint8)
+    return buffer[:h, :w]
+
+
+def _convolve(src: np.ndarray, kernels: tuple[np.ndarray, ...], dst: np.ndarray) -> np.ndarray:
+    result = cv2.filter2D(src, -1, kernels[0], dst=dst)
+    for kernel in kernels[1:]:
+        result = cv2.filter2D(result, -1, kernel, dst=result)
+    return result
+
+
+def blur_along_motion(
+    image: np.ndarray,
+    motion: np.ndarray,
+    shutter: float = MOTION_SHUTTER,
+    max_length: int = MAX_BLUR_LENGTH,
+    dst: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Blur each tile of image along its motion.
+
+    Args:
+        image: Input frame
+        motion: (rows, cols, 2) velocities in pixels per frame at the tile
+            centres (an entry of services.transform_plan.build_motion_plan)
+        shutter: Fraction of the frame interval the shutter is open
+        max_length: Longest blur in pixels
+        dst: Optional output buffer (must not be image)
+
+    Returns:
+        The blurred frame, or image itself if nothing moves far enough
+    """
+    h, w = image.shape[:2]
+    rows, cols = motion.shape[:2]
+    keys = [[_kernel_key(velocity, shutter, max_length) for velocity in row] for row in motion]
+    distinct = {key for row in keys for key in row}
+    if distinct == {None}:
+        return image
+    if dst is None:
+        dst = np.empty_like(image)
+
+    # Uniform motion (a pan): one pass over the whole frame
+    if len(distinct) == 1:
+        return _convolve(image, motion_kernels(*distinct.pop()), dst)
+
+    for r in range(rows):
+        y0, y1 = r * h // rows, (r + 1) * h // rows
+        for c in range(cols):
+            x0, x1 = c * w // cols, (c + 1) * w // cols
+            key = keys[r][c]
+            if key is None:
+                dst[y0:y1, x0:x1] = image[y0:y1, x0:x1]
+                continue
+
+            # Convolve the tile plus a margin the kernels reach into, so
+            # tile edges see their real neighbours rather than a border
+            kernels = motion_kernels(*key)
+            margin = sum(max(kernel.shape) // 2 for kernel in kernels)
+            ya, yb = max(y0 - margin, 0), min(y1 + margin, h)
+            xa, xb = max(x0 - margin, 0), min(x1 + margin, w)
+            tile = _convolve(image[ya:yb, xa:xb], kernels, _scratch(yb - ya, xb - xa))
+            dst[y0:y1, x0:x1] = tile[y0 - ya:y1 - ya, x0 - xa:x1 - xa]
+
+    return dst
+
+
+class SubframeAccumulator:
+    """Accumulated motion blur buffers for one frame size, sample count and scale."""
+
+    def __init__(self, size: tuple[int, int], samples: int, scale: float = SUBFRAME_SCALE):
+        w, h = size
+        self.size = (w, h)
+        self.samples = samples
+        self.scale = min(scale, 1.0)
+        sw, sh = max(1, round(w * self.scale)), max(1, round(h * self.scale))
+        self.small_size = (sw, sh)
+
+        # Full size to sub-frame pixels, same pixel-centre convention as cv2.resize
+        fx, fy = sw / w, sh / h
+        self.down = np.array([[fx, 0, 0.5 * fx - 0.5], [0, fy, 0.5 * fy - 0.5], [0, 0, 1]])
+        self.up = np.linalg.inv(self.down)
+
+        self.batch = np.empty((samples, sh, sw, 3), dtype=np.uint8)
+        self.total = np.empty((sh, sw, 3), dtype=np.uint16)
+        if self.scale < 1.0:
+            self.small = np.empty((sh, sw, 3), dtype=np.uint8)
+            self.centre = np.empty((sh, sw, 3), dtype=np.uint8)
+            self.residual_small = np.empty((sh, sw, 3), dtype=np.int16)
+            self.residual = np.empty((h, w, 3), dtype=np.int16)
+
+    def _warp(self, source: np.ndarray, matrix: np.ndarray, border_mode: int, dst: np.ndarray) -> np.ndarray:
+        return cv2.warpPerspective(
+            source, self.down @ matrix @ self.up, self.small_size,
+            dst=dst, flags=cv2.INTER_LINEAR, borderMode=border_mode
+        )
+
+    def render(
+        self,
+        image: np.ndarray,
+        centre: np.ndarray,
+        matrices: tuple[np.ndarray, ...],
+        border_mode: int,
+        dst: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Warp image with motion blur accumulated over sub-frames.
+
+        Args:
+            image: Unwarped frame
+            centre: The frame's own homography
+            matrices: Sub-frame homographies (build_subframe_plan)
+            border_mode: cv2 border mode of the warp
+            dst: Optional output buffer (must not be image)
+        """
+        n = self.samples
+        if self.scale < 1.0:
+            source = cv2.resize(image, self.small_size, dst=self.small, interpolation=cv2.INTER_AREA)
+        else:
+            source = image
+        for k, matrix in enumerate(matrices):
+            self._warp(source, matrix, border_mode, self.batch[k])
+        total = np.sum(self.batch, axis=0, dtype=np.uint16, out=self.total)
+
+        if dst is None:
+            dst = np.empty_like(image)
+
+        if self.scale >= 1.0:
+            # Rounded mean of the sub-frames is the frame
+            np.add(total, n // 2, out=total)
+            np.floor_divide(total, n, out=total)
+            np.copyto(dst, total, casting="unsafe")
+            return dst
+
+        # Mean minus centre at sub-frame resolution (total <= 16 * 255 fits int16)
+        residual = self.residual_small
+        np.multiply(self._warp(source, centre, border_mode, self.centre), n, out=residual, dtype=np.int16)
+        np.subtract(total.view(np.int16), residual, out=residual)
+        np.add(residual, n // 2, out=residual)
+        np.floor_divide(residual, n, out=residual)
+        cv2.resize(residual, self.size, dst=self.residual, interpolation=cv2.INTER_LINEAR)
+
+        w, h = self.size
+        cv2.warpPerspective(image, centre, (w, h), dst=dst, flags=cv2.INTER_LINEAR, borderMode=border_mode)
+        return cv2.add(dst, self.residual, dst=dst, dtype=cv2.CV_8U)
+
+
+def get_subframe_accumulator(size: tuple[int, int], samples: int, scale: float = SUBFRAME_SCALE) -> SubframeAccumulator:
+    """
+    Return this thread's accumulator for the given settings.
+
+    samples is clamped to 2..MAX_SUBFRAMES and scale rounded to
+    SUBFRAME_SCALE_STEP within MIN_SUBFRAME_SCALE..1, so nearby settings
+    share an accumulator.
+    """
+    accumulators = getattr(_local, "accumulators", None)
+    if accumulators is None:
+        accumulators = _local.accumulators = OrderedDict()
+    samples = min(max(int(samples), 2), MAX_SUBFRAMES)
+    scale = round(min(max(scale, MIN_SUBFRAME_SCALE), 1.0) / SUBFRAME_SCALE_STEP) * SUBFRAME_SCALE_STEP
+    key = (tuple(size), samples, round(scale, 2))
+    accumulator = accumulators.get(key)
+    if accumulator is not None:
+        accumulators.move_to_end(key)
+        return accumulator
+
+    accumulator = accumulators[key] = SubframeAccumulator(*key)
+    while len(accumulators) > SUBFRAME_CACHE_SIZE:
+        accumulators.popitem(last=False)
+    return accumulator
@@ -0,0 +1,219 @@
+"""Parallel frame rendering on a process pool.
+
+Every frame depends only on its two source images and its progress value,
+so frames are rendered on a shared pool of worker processes. The source
+images (all of them, for a sequence) are copied once per job into a
+shared memory block; tasks carry only the block name and the frames to
+render, and each worker maps the block the first time it sees it.
+
+Frames are sent to the pool in blocks of K = RENDER_BLOCK_FRAMES
+consecutive frames. A block only batches dispatch: the worker still
+renders it frame by frame, and the serial path is unchanged. Each job
+has a shared output array of (slots, K, H, W, 3) frames that a task
+renders its block straight into, so frames are never pickled and each
+task costs one round trip for K frames. Frames are copied out of the
+slots in order into a FrameRing, as the serial iterator yields them, and
+slots are reused, so memory stays at (workers + 1) * K frames however
+many frames a job has.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+from typing import Iterator
+import threading
+
+import numpy as np
+
+from config import RENDER_BLOCK_FRAMES, RENDER_PROCESSES
+from services.frame_generator_3d import DEFAULT_EFFECTS, load_sources, render_frames_into, sequence_frames
+from services.frame_buffers import FrameRing
+from services.metrics import timed
+from services.render_profile import DEFAULT_PROFILE, RenderProfile
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+# Per-worker view of the current job's source images and output slots
+_worker_shm: shared_memory.SharedMemory | None = None
+_worker_sources: tuple[np.ndarray, ...] | None = None
+_worker_out_shm: shared_memory.SharedMemory | None = None
+_worker_out: np.ndarray | None = None
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared render pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process runs threads (job workers, uvicorn)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the render pool if it was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _attach_sources(shm_name: str, count: int, shape: tuple) -> tuple[np.ndarray, ...]:
+    global _worker_shm, _worker_sources
+    if _worker_shm is None or _worker_shm.name != shm_name:
+        if _worker_shm is not None:
+            _worker_sources = None
+            _worker_shm.close()
+        _worker_shm = shared_memory.SharedMemory(name=shm_name)
+        stacked = np.ndarray((count, *shape), dtype=np.uint8, buffer=_worker_shm.buf)
+        _worker_sources = tuple(stacked)
+    return _worker_sources
+
+
+def _attach_output(shm_name: str, shape: tuple) -> np.ndarray:
+    global _worker_out_shm, _worker_out
+    if _worker_out_shm is None or _worker_out_shm.name != shm_name:
+        if _worker_out_shm is not None:
+            _worker_out = None
+            _worker_out_shm.close()
+        _worker_out_shm = shared_memory.SharedMemory(name=shm_name)
+        _worker_out = np.ndarray(shape, dtype=np.uint8, buffer=_worker_out_shm.buf)
+    return _worker_out
+
+
+def _render_block(
+    shm_name: str,
+    count: int,
+    shape: tuple,
+    out_name: str,
+    out_shape: tuple,
+    slot: int,
+    frames: list[tuple[int, int]],
+    frame_count: int,
+    segment_effects: list[dict]
+) -> None:
+    sources = _attach_sources(shm_name, count, shape)
+    out = _attach_output(out_name, out_shape)
+    render_frames_into(sources, frames, frame_count, segment_effects, out[slot])
+
+
+def _blocks(frames: Iterator[tuple[int, int]], size: int) -> Iterator[list[tuple[int, int]]]:
+    block = []
+    for frame in frames:
+        block.append(frame)
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def iter_3d_transition_frames_parallel(
+    image1_path: Path,
+    image2_path: Path,
+    effects: dict = None,
+    workers: int = RENDER_PROCESSES,
+    profile: RenderProfile = DEFAULT_PROFILE,
+    hashes: tuple[str, str] | None = None
+) -> Iterator[np.ndarray]:
+    """
+    Yield transition frames rendered across a process pool.
+
+    Drop-in replacement for iter_3d_transition_frames.
+
+    Args:
+        image1_path: Path to initial image
+        image2_path: Path to final image
+        effects: Dictionary of effect settings
+        workers: Size of the render pool (only used when the pool starts)
+        profile: Output size and frame count
+        hashes: SHA-256 of both images if already known
+
+    Yields:
+        RGB frames in order
+    """
+    if effects is None:
+        effects = DEFAULT_EFFECTS
+
+    yield from iter_sequence_frames_parallel([image1_path, image2_path], [effects], workers, profile, hashes)
+
+
+def iter_sequence_frames_parallel(
+    image_paths: list[Path],
+    segment_effects: list[dict],
+    workers: int = RENDER_PROCESSES,
+    profile: RenderProfile = DEFAULT_PROFILE,
+    hashes: list[str] | None = None
+) -> Iterator[np.ndarray]:
+    """
+    Yield the frames of an image sequence rendered across a process pool.
+
+    Drop-in replacement for iter_sequence_frames: all sources go into one
+    shared memory block and frames of every segment share the same
+    in-order window of blocks. Yielded frames come from a FrameRing, as
+    with the serial iterator.
+
+    Yields:
+        RGB frames in order
+    """
+    if len(image_paths) < 2:
+        raise ValueError("A sequence needs at least two images")
+    if len(segment_effects) != len(image_paths) - 1:
+        raise ValueError(f"Expected effects for {len(image_paths) - 1} segments, got {len(segment_effects)}")
+
+    with timed("decode"):
+        sources = load_sources(image_paths, profile.size, hashes)
+    count = len(sources)
+    shape = sources[0].shape
+    frame_count = profile.frame_count
+
+    block_frames = max(RENDER_BLOCK_FRAMES, 1)
+    # One block per worker plus the one being yielded
+    slots = max(workers, 1) + 1
+    out_shape = (slots, block_frames, *shape)
+
+    shm = shared_memory.SharedMemory(create=True, size=sources[0].nbytes * count)
+    out_shm = shared_memory.SharedMemory(create=True, size=sources[0].nbytes * slots * block_frames)
+    try:
+        stacked = np.ndarray((count, *shape), dtype=np.uint8, buffer=shm.buf)
+        for slot, source in zip(stacked, sources):
+            slot[...] = source
+        del stacked
+        out = np.ndarray(out_shape, dtype=np.uint8, buffer=out_shm.buf)
+
+        pool = _get_pool(workers)
+        ring = FrameRing(profile.size)
+        free = deque(range(slots))
+        pending = deque()
+        blocks = _blocks(sequence_frames(count - 1, frame_count), block_frames)
+        next_block = next(blocks, None)
+        try:
+            while next_block is not None or pending:
+                # Keep every free slot busy
+                while next_block is not None and free:
+                    slot = free.popleft()
+                    pending.append((slot, len(next_block), pool.submit(
+                        _render_block, shm.name, count, shape, out_shm.name, out_shape, slot,
+                        next_block, frame_count, segment_effects
+                    )))
+                    next_block = next(blocks, None)
+                slot, size, future = pending.popleft()
+                with timed("frame_wait"):
+                    future.result()
+                # Copy out: shared memory is unmapped when the job ends
+                for k in range(size):
+                    frame = ring.next()
+                    np.copyto(frame, out[slot, k])
+                    yield frame
+                free.append(slot)
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            del out
+    finally:
+        shm.close()
+        shm.unlink()
+        out_shm.close()
+        out_shm.unlink()
@@ -0,0 +1,111 @@
+"""Fast low-resolution previews.
+
+A preview renders the same transition as the full video, through the
+same effect pipeline, at a proxy profile: PREVIEW_SHORT_SIDE pixels on
+the short side and PREVIEW_FPS frames per second over the same duration
+and aspect ratio. Frame progress is index / (frame_count - 1), so the
+fewer frames sample the same animation, and pixel effect parameters are
+scaled to the proxy size like any other profile.
+
+Previews are encoded as an animated WebP by default (GIF or MP4 on
+request, with the fast-preview encoder profile) and returned in memory.
+"""
+from pathlib import Path
+import io
+import os
+import tempfile
+
+from PIL import Image
+
+from config import PREVIEW_FPS, PREVIEW_SHORT_SIDE
+from services.encode_profile import ENCODE_PROFILES
+from services.frame_generator_3d import iter_3d_transition_frames
+from services.metrics import timed
+from services.render_profile import RenderProfile
+from services.video_creator import write_video_from_frames
+
+# Format -> media type
+PREVIEW_FORMATS = {
+    "webp": "image/webp",
+    "gif": "image/gif",
+    "mp4": "video/mp4",
+}
+
+
+def preview_profile(profile: RenderProfile) -> RenderProfile:
+    """Proxy of profile at preview size and frame rate, same aspect ratio and duration."""
+    scale = min(1.0, PREVIEW_SHORT_SIDE / min(profile.size))
+    width = max(2, int(round(profile.width * scale / 2)) * 2)
+    height = max(2, int(round(profile.height * scale / 2)) * 2)
+    fps = min(PREVIEW_FPS, profile.fps)
+    frame_count = max(2, int(round(profile.duration * fps)))
+    return RenderProfile(width, height, fps, frame_count)
+
+
+def _encode_animation(frames, fps: int, fmt: str) -> bytes:
+    images = [Image.fromarray(frame) for frame in frames]
+    if fmt == "gif":
+        # Fast palette per frame; PIL's default median cut is several times slower
+        images = [image.quantize(256, method=Image.Quantize.FASTOCTREE) for image in images]
+        options = {}
+    else:
+        options = {"quality": 70, "method": 0}
+
+    buffer = io.BytesIO()
+    images[0].save(
+        buffer,
+        format=fmt.upper(),
+        save_all=True,
+        append_images=images[1:],
+        duration=int(round(1000 / fps)),
+        loop=0,
+        **options
+    )
+    return buffer.getvalue()
+
+
+def _encode_mp4(frames, fps: int) -> bytes:
+    fd, name = tempfile.mkstemp(suffix=".mp4")
+    os.close(fd)
+    path = Path(name)
+    try:
+        write_video_from_frames(frames, path, fps=fps, encoding=ENCODE_PROFILES["fast-preview"])
+        return path.read_bytes()
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def render_preview(
+    image1_path: Path,
+    image2_path: Path,
+    effects: dict,
+    profile: RenderProfile,
+    fmt: str = "webp",
+    hashes: tuple[str, str] | None = None
+) -> bytes:
+    """
+    Render and encode a preview of a transition.
+
+    Args:
+        image1_path: Path to initial image
+        image2_path: Path to final image
+        effects: Dictionary of effect settings
+        profile: Profile of the full render being previewed
+        fmt: One of PREVIEW_FORMATS
+        hashes: SHA-256 of both images if already known
+
+    Returns:
+        Encoded preview bytes
+    """
+    if fmt not in PREVIEW_FORMATS:
+        raise ValueError(f"Unknown preview format '{fmt}'. Allowed: {list(PREVIEW_FORMATS)}")
+
+    proxy = preview_profile(profile)
+    with timed("preview_render"):
+        # The iterator reuses its frame buffers; previews keep every frame
+        frames = [frame.copy() for frame in iter_3d_transition_frames(image1_path, image2_path, effects, proxy, hashes)]
+
+    with timed("preview_encode"):
+        if fmt == "mp4":
+            return _encode_mp4(frames, proxy.fps)
+        return _encode_animation(frames, proxy.fps, fmt)
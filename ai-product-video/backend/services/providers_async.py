@@ -0,0 +1,456 @@
+"""Provider adapters for external image->video generation.
+
+Each provider is configured through environment variables: by default
+<PROVIDER>_API_URL and an optional <PROVIDER>_API_KEY, to which the
+adapter POSTs multipart/form-data with the fields prompt, initial_image
+and final_image and expects MP4 bytes back. Luma and Google have their
+own request formats (see call_luma_sdk and call_google).
+
+Every step (upload -> render -> poll -> download) awaits on the event
+loop instead of blocking a worker thread. Uploads of both images run
+concurrently and status polling uses asyncio.sleep, so hundreds of
+outstanding provider renders cost little more than their sockets while
+they wait.
+
+All calls share one httpx.AsyncClient with a bounded keep-alive pool.
+Connection errors are retried by the transport. GETs (status polls and
+downloads) are also retried with exponential backoff on 5xx responses,
+timeouts (read, write and pool) and other transport errors; POSTs that
+may have started a render never are. Videos are streamed to disk in chunks, with the
+file writes done off the event loop.
+"""
+from pathlib import Path
+import asyncio
+import base64
+import json
+import os
+import time
+
+from fastapi import HTTPException
+import httpx
+
+from config import PROVIDER_HTTP_BACKOFF, PROVIDER_HTTP_POOL_SIZE, PROVIDER_HTTP_RETRIES
+from services.metrics import PROVIDER_SECONDS
+
+CHUNK_SIZE = 1024 * 1024
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_client = None
+
+
+def get_async_client():
+    """Return the shared async provider client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=PROVIDER_HTTP_POOL_SIZE * 10,
+                max_keepalive_connections=PROVIDER_HTTP_POOL_SIZE,
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=PROVIDER_HTTP_RETRIES),
+            timeout=120,
+        )
+    return _client
+
+
+async def close_async_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _body(resp) -> object:
+    try:
+        return resp.json()
+    except Exception:
+        return resp.text
+
+
+def _extract_id_or_url(resp_json: dict) -> str | None:
+    # Helper to fetch common fields used by SDKs
+    for key in ("id", "asset_id", "url", "upload_url", "location"):
+        if key in resp_json:
+            return resp_json[key]
+    return None
+
+
+async def _get(url: str, headers: dict | None = None, timeout: float = 60):
+    """GET with backoff on 5xx responses, timeouts and transport errors."""
+    client = get_async_client()
+    for attempt in range(PROVIDER_HTTP_RETRIES + 1):
+        last = attempt == PROVIDER_HTTP_RETRIES
+        try:
+            resp = await client.get(url, headers=headers or {}, timeout=timeout)
+        except (httpx.TimeoutException, httpx.TransportError):
+            if last:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUSES or last:
+                return resp
+        await asyncio.sleep(PROVIDER_HTTP_BACKOFF * (2 ** attempt))
+
+
+async def _write_stream(resp, output_path: Path, first_chunk: bytes = b"", chunks=None) -> Path:
+    output_path = Path(output_path)
+    partial = output_path.with_name(output_path.name + ".part")
+    if chunks is None:
+        chunks = resp.aiter_bytes(CHUNK_SIZE)
+    out_f = await asyncio.to_thread(open, partial, "wb")
+    try:
+        if first_chunk:
+            await asyncio.to_thread(out_f.write, first_chunk)
+        async for chunk in chunks:
+            await asyncio.to_thread(out_f.write, chunk)
+        await asyncio.to_thread(out_f.close)
+        await asyncio.to_thread(os.replace, partial, output_path)
+    except BaseException:
+        out_f.close()
+        partial.unlink(missing_ok=True)
+        raise
+    return output_path
+
+
+async def _save_video_response(resp, output_path: Path, label: str) -> Path:
+    chunks = resp.aiter_bytes(CHUNK_SIZE)
+    first_chunk = b""
+    async for chunk in chunks:
+        first_chunk = chunk
+        break
+
+    content_type = resp.headers.get("Content-Type", "")
+    if "video" in content_type or first_chunk[:4] == b"\x00\x00\x00\x18" or first_chunk[4:8] == b"ftyp":
+        return await _write_stream(resp, output_path, first_chunk, chunks)
+
+    body = first_chunk
+    async for chunk in chunks:
+        body += chunk
+    try:
+        detail = json.loads(body)
+    except Exception:
+        detail = body.decode("utf-8", errors="replace")
+    raise HTTPException(status_code=502, detail=f"{label} returned unexpected response: {detail}")
+
+
+async def _download(url: str, output_path: Path, label: str, headers: dict | None = None) -> Path:
+    client = get_async_client()
+    for attempt in range(PROVIDER_HTTP_RETRIES + 1):
+        last = attempt == PROVIDER_HTTP_RETRIES
+        try:
+            async with client.stream("GET", url, headers=headers or {}, timeout=120) as resp:
+                if resp.status_code == 200:
+                    # A timeout mid-body discards the .part file and starts over
+                    return await _write_stream(resp, output_path)
+                if resp.status_code not in RETRY_STATUSES or last:
+                    raise HTTPException(status_code=502, detail=f"Failed to download {label} output: {resp.status_code}")
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            if last:
+                raise HTTPException(status_code=502, detail=f"Failed to download {label} output: {e!r}")
+        await asyncio.sleep(PROVIDER_HTTP_BACKOFF * (2 ** attempt))
+
+
+def _read(path: Path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _multipart_post(url: str, headers: dict, data: dict, img1_path: Path, img2_path: Path, output_path: Path, label: str, timeout: float) -> Path:
+    img1, img2 = await asyncio.gather(asyncio.to_thread(_read, img1_path), asyncio.to_thread(_read, img2_path))
+    files = {
+        "initial_image": (Path(img1_path).name, img1),
+        "final_image": (Path(img2_path).name, img2),
+    }
+    async with get_async_client().stream("POST", url, headers=headers, files=files, data=data, timeout=timeout) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            raise HTTPException(status_code=502, detail=f"{label} error: {_body(resp)}")
+        return await _save_video_response(resp, output_path, label)
+
+
+async def _generic_post(url: str, api_key: str | None, prompt: str, img1_path: Path, img2_path: Path, output_path: Path) -> Path:
+    headers = {}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return await _multipart_post(url, headers, {"prompt": prompt or ""}, img1_path, img2_path, output_path, "Provider", 120)
+
+
+async def _call_env_provider(name: str, prompt: str, img1_path: Path, img2_path: Path, output_path: Path) -> Path:
+    url = os.environ.get(f"{name}_API_URL")
+    api_key = os.environ.get(f"{name}_API_KEY")
+    if not url:
+        raise HTTPException(status_code=400, detail=f"{name}_API_URL not configured")
+    return await _generic_post(url, api_key, prompt, img1_path, img2_path, output_path)
+
+
+async def call_luma(prompt: str, img1_path: Path, img2_path: Path, output_path: Path) -> Path:
+    """
+    Luma adapter.
+
+    Uses the SDK-style flow (call_luma_sdk) when LUMA_API_STYLE=sdk or
+    LUMA_UPLOAD_URL and LUMA_RENDER_URL are set, otherwise a multipart POST
+    to LUMA_API_URL with optional LUMA_MODEL and LUMA_PARAMS (JSON) options.
+    """
+    url = os.environ.get("LUMA_API_URL")
+    api_key = os.environ.get("LUMA_API_KEY")
+    sdk_mode = os.environ.get("LUMA_API_STYLE", "").strip().lower() == "sdk"
+    upload_url = os.environ.get("LUMA_UPLOAD_URL")
+    render_url = os.environ.get("LUMA_RENDER_URL")
+    if sdk_mode or (upload_url and render_url):
+        return await call_luma_sdk(prompt, img1_path, img2_path, output_path)
+
+    if not url:
+        raise HTTPException(status_code=400, detail="LUMA_API_URL not configured")
+
+    options = {}
+    model = os.environ.get("LUMA_MODEL")
+    params = os.environ.get("LUMA_PARAMS")
+    if model:
+        options["model"] = model
+    if params:
+        try:
+            options.update(json.loads(params))
+        except Exception:
+            pass
+
+    headers = {}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+
+    data = {"prompt": prompt or ""}
+    if options:
+        data["options"] = json.dumps(options)
+
+    return await _multipart_post(url, headers, data, img1_path, img2_path, output_path, "Luma API", 180)
+
+
+async def _luma_upload(upload_url: str, headers: dict, path: Path) -> str:
+    content = await asyncio.to_thread(_read, path)
+    r = await get_async_client().post(upload_url, headers=headers, files={"file": (Path(path).name, content)}, timeout=120)
+    if r.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Luma upload failed: {r.text}")
+    try:
+        j = r.json()
+    except Exception:
+        raise HTTPException(status_code=502, detail=f"Luma upload returned non-json: {r.text}")
+    asset = _extract_id_or_url(j)
+    if not asset:
+        raise HTTPException(status_code=502, detail=f"Luma upload response missing asset id/url: {j}")
+    return asset
+
+
+async def call_luma_sdk(prompt: str, img1_path: Path, img2_path: Path, output_path: Path) -> Path:
+    """SDK-style Luma flow (upload -> render -> poll -> download).
+
+    Required env vars:
+      - LUMA_UPLOAD_URL: endpoint to upload assets (returns asset id/url)
+      - LUMA_RENDER_URL: endpoint to create render jobs
+      - LUMA_API_KEY: bearer token (optional but recommended)
+
+    Optional env vars:
+      - LUMA_MODEL: model name to request
+      - LUMA_RENDER_STATUS_URL: template for status check, e.g. {render_url}/{job_id}
+      - LUMA_API_POLL_TIMEOUT: total seconds to wait (default 300)
+      - LUMA_API_POLL_INTERVAL: seconds between polls (default 2)
+
+    Notes: Exact Luma public API may differ; set the above env vars according to
+    your Luma account docs. This adapter tries to follow common provider patterns.
+    """
+    upload_url = os.environ.get("LUMA_UPLOAD_URL")
+    render_url = os.environ.get("LUMA_RENDER_URL")
+    api_key = os.environ.get("LUMA_API_KEY")
+
+    if not upload_url or not render_url:
+        raise HTTPException(status_code=400, detail="LUMA_UPLOAD_URL and LUMA_RENDER_URL must be configured for SDK mode")
+
+    headers = {}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+
+    # Upload both images concurrently
+    asset1, asset2 = await asyncio.gather(
+        _luma_upload(upload_url, headers, img1_path),
+        _luma_upload(upload_url, headers, img2_path),
+    )
+
+    # Create render job
+    body = {
+        "prompt": prompt or "",
+        "assets": [asset1, asset2]
+    }
+    model = os.environ.get("LUMA_MODEL")
+    if model:
+        body["model"] = model
+
+    try:
+        rr = await get_async_client().post(render_url, headers={**headers, "Content-Type": "application/json"}, json=body, timeout=120)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Luma render request failed: {e}")
+
+    if rr.status_code not in (200, 201):
+        raise HTTPException(status_code=502, detail=f"Luma render error: {rr.status_code} {rr.text}")
+
+    try:
+        jr = rr.json()
+    except Exception:
+        raise HTTPException(status_code=502, detail=f"Luma render returned non-json: {rr.text}")
+
+    job_id = _extract_id_or_url(jr) or jr.get("job_id") or jr.get("id")
+    possible_output = _extract_id_or_url(jr) or jr.get("output_url") or jr.get("result_url")
+
+    if possible_output and (isinstance(possible_output, str) and possible_output.startswith("http")):
+        return await _download(possible_output, output_path, "Luma", headers=headers)
+
+    if not job_id:
+        raise HTTPException(status_code=502, detail=f"Luma render response missing job id: {jr}")
+
+    # Poll for job completion without holding a thread
+    poll_timeout = int(os.environ.get("LUMA_API_POLL_TIMEOUT", "300"))
+    poll_interval = float(os.environ.get("LUMA_API_POLL_INTERVAL", "2"))
+    status_url_template = os.environ.get("LUMA_RENDER_STATUS_URL") or (render_url.rstrip("/") + "/{job_id}")
+    status_url = status_url_template.format(job_id=job_id)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + poll_timeout
+    while loop.time() < deadline:
+        try:
+            s = await _get(status_url, headers=headers, timeout=60)
+            js = s.json() if s.status_code == 200 else None
+        except Exception:
+            js = None
+
+        if js is not None:
+            status = js.get("status") or js.get("state")
+            if status and status.lower() in ("succeeded", "completed", "done"):
+                out_url = _extract_id_or_url(js) or js.get("output_url") or js.get("result_url") or js.get("video_url")
+                if out_url:
+                    return await _download(out_url, output_path, "Luma", headers=headers)
+                data = js.get("result")
+                if isinstance(data, str) and data.startswith("http"):
+                    return await _download(data, output_path, "Luma", headers=headers)
+                raise HTTPException(status_code=502, detail=f"Luma job succeeded but no downloadable output found: {js}")
+
+            if status and status.lower() in ("failed", "error"):
+                raise HTTPException(status_code=502, detail=f"Luma job failed: {js}")
+
+        await asyncio.sleep(poll_interval)
+
+    raise HTTPException(status_code=504, detail=f"Luma render timed out after {poll_timeout} seconds")
+
+
+def _google_token(sa_path: str) -> str:
+    from google.oauth2 import service_account
+    from google.auth.transport.requests import Request as GoogleRequest
+    creds = service_account.Credentials.from_service_account_file(sa_path, scopes=["https://www.googleapis.com/auth/cloud-platform"])
+    creds.refresh(GoogleRequest())
+    return creds.token
+
+
+async def call_google(prompt: str, img1_path: Path, img2_path: Path, output_path: Path) -> Path:
+    """Adapter for Google AI Studio / Generative APIs.
+
+    Preferred configuration:
+      - Set `GOOGLE_AI_API_URL` to the model endpoint that accepts a JSON
+        payload containing `prompt` and image data (base64).
+      - Authentication via `GOOGLE_API_KEY` (simple) or
+        `GOOGLE_APPLICATION_CREDENTIALS` service account JSON (recommended).
+
+    This adapter will base64-encode the two images and POST a JSON body:
+      {"prompt": ..., "images": [{"mime":..., "b64":...}, ...], "duration": seconds}
+
+    The exact API path for Google AI Studio may vary; if your account uses
+    a different contract, set `GOOGLE_AI_API_URL` to a proxy that translates
+    our payload into the provider-specific shape.
+    """
+    url = os.environ.get("GOOGLE_AI_API_URL")
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    sa_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    project = os.environ.get("GOOGLE_AI_PROJECT")
+    model = os.environ.get("GOOGLE_AI_STUDIO_MODEL") or os.environ.get("GOOGLE_AI_MODEL")
+
+    if not url:
+        if project and model:
+            url = f"https://generativelanguage.googleapis.com/v1beta2/{project}/models/{model}:generateVideo"
+        else:
+            raise HTTPException(status_code=400, detail="GOOGLE_AI_API_URL not configured and no project/model available")
+
+    img1, img2 = await asyncio.gather(asyncio.to_thread(_read, img1_path), asyncio.to_thread(_read, img2_path))
+
+    payload = {
+        "prompt": prompt or "",
+        "images": [
+            {"mime": "image/jpeg", "b64": base64.b64encode(img1).decode("ascii")},
+            {"mime": "image/jpeg", "b64": base64.b64encode(img2).decode("ascii")},
+        ],
+        "duration": float(os.environ.get("GOOGLE_AI_VIDEO_DURATION", "5"))
+    }
+
+    headers = {"Content-Type": "application/json"}
+
+    if api_key:
+        url = f"{url}?key={api_key}"
+    else:
+        if not sa_path:
+            raise HTTPException(status_code=400, detail="No GOOGLE_API_KEY or GOOGLE_APPLICATION_CREDENTIALS configured for Google provider")
+        try:
+            headers["Authorization"] = f"Bearer {await asyncio.to_thread(_google_token, sa_path)}"
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to obtain Google credentials: {e}")
+
+    async with get_async_client().stream("POST", url, headers=headers, content=json.dumps(payload), timeout=300) as resp:
+        if resp.status_code not in (200, 201):
+            await resp.aread()
+            raise HTTPException(status_code=502, detail=f"Google AI Studio error: {_body(resp)}")
+
+        content_type = resp.headers.get("Content-Type", "")
+        if "application/json" not in content_type:
+            # Binary MP4 bytes
+            return await _write_stream(resp, output_path)
+
+        await resp.aread()
+        try:
+            j = resp.json()
+        except Exception:
+            raise HTTPException(status_code=502, detail="Google returned invalid JSON")
+
+    out = j.get("output_url") or j.get("result_url") or j.get("video_url")
+    if out and isinstance(out, str) and out.startswith("http"):
+        return await _download(out, output_path, "Google")
+    raise HTTPException(status_code=502, detail=f"Google returned JSON but no output URL: {j}")
+
+
+_GOOGLE_ALIASES = ("google", "gcp", "ai_studio", "ai-studio", "googleai")
+
+
+def provider_name(provider: str | None) -> str:
+    """
+    Canonical adapter name for a requested provider.
+
+    One of luma, google, openai, runway, pika or external (anything
+    else), so metrics are labelled with a fixed set of values whatever
+    clients send.
+    """
+    p = (provider or "").strip().lower()
+    if p in _GOOGLE_ALIASES:
+        return "google"
+    if p in ("luma", "openai", "runway", "pika"):
+        return p
+    return "external"
+
+
+async def call_provider_async(provider: str, prompt: str, img1_path: Path, img2_path: Path, output_path: Path) -> Path:
+    """Generate a video with an external provider and return its path."""
+    name = provider_name(provider)
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        if name == "luma":
+            result = await call_luma(prompt, img1_path, img2_path, output_path)
+        elif name == "google":
+            result = await call_google(prompt, img1_path, img2_path, output_path)
+        else:
+            # openai, runway, pika and the generic external endpoint
+            result = await _call_env_provider(name.upper(), prompt, img1_path, img2_path, output_path)
+        outcome = "ok"
+        return result
+    finally:
+        PROVIDER_SECONDS.observe(time.perf_counter() - start, provider=name, outcome=outcome)
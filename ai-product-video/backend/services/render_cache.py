@@ -0,0 +1,202 @@
+"""Content-addressed cache of rendered videos.
+
+A render is fully determined by the two source images, the effect
+settings, the video settings and the provider/prompt, so the SHA-256 of
+all of them identifies the output. Cached MP4s live under RENDER_CACHE_DIR
+and are evicted least-recently-used once their total size exceeds
+RENDER_CACHE_MAX_BYTES.
+
+Entries are hard-linked in and out of the cache (falling back to a copy),
+so a job's output file survives eviction of its cache entry.
+"""
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+from config import DEFAULT_3D_EFFECTS, RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES
+from services.encode_profile import DEFAULT_ENCODE_PROFILE, EncodeProfile
+from services.render_profile import DEFAULT_PROFILE, RenderProfile
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_effects(effects: dict | None) -> dict:
+    """Fill in defaults so equivalent effect settings produce the same key."""
+    normalized = DEFAULT_3D_EFFECTS.copy()
+    if effects:
+        normalized.update(effects)
+    return normalized
+
+
+def make_cache_key(
+    image1_hash: str,
+    image2_hash: str,
+    effects: dict | None = None,
+    provider: str | None = None,
+    prompt: str | None = None,
+    profile: RenderProfile = DEFAULT_PROFILE,
+    encoding: EncodeProfile = DEFAULT_ENCODE_PROFILE
+) -> str:
+    """
+    Build the cache key for a render.
+
+    Args:
+        image1_hash: SHA-256 hex digest of the initial image
+        image2_hash: SHA-256 hex digest of the final image
+        effects: Effect settings for the render
+        provider: External provider name, if any
+        prompt: Provider prompt, if any
+        profile: Output size, fps and frame count of a local render
+        encoding: Encoder settings of a local render
+
+    Returns:
+        SHA-256 hex digest identifying the output video
+    """
+    provider = (provider or "").strip().lower()
+    payload = {
+        "images": [image1_hash, image2_hash],
+        "provider": provider,
+        "prompt": (prompt or "") if provider else "",
+        # Local effects and video settings don't apply to provider renders
+        "effects": None if provider else normalize_effects(effects),
+        "video": None if provider else {
+            "fps": profile.fps,
+            "frame_count": profile.frame_count,
+            "resolution": list(profile.size),
+        },
+        "encoding": None if provider else encoding.to_dict(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def make_sequence_cache_key(
+    image_hashes: list[str],
+    segment_effects: list[dict],
+    profile: RenderProfile = DEFAULT_PROFILE,
+    encoding: EncodeProfile = DEFAULT_ENCODE_PROFILE
+) -> str:
+    """
+    Build the cache key for an image sequence render.
+
+    Args:
+        image_hashes: SHA-256 hex digests of the images, in order
+        segment_effects: Effect settings for each transition
+        profile: Output size, fps and frames per transition
+        encoding: Encoder settings
+
+    Returns:
+        SHA-256 hex digest identifying the output video
+    """
+    payload = {
+        "sequence": list(image_hashes),
+        "effects": [normalize_effects(effects) for effects in segment_effects],
+        "video": {
+            "fps": profile.fps,
+            "frame_count": profile.frame_count,
+            "resolution": list(profile.size),
+        },
+        "encoding": encoding.to_dict(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class RenderCache:
+    """Size-bounded LRU cache of rendered MP4s on disk."""
+
+    def __init__(self, root: Path = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.mp4"
+
+    def _load(self) -> None:
+        # Rebuild the LRU order from modification times left by previous runs
+        self.root.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.root.glob("*.mp4"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self._total_bytes += size
+
+    def get(self, key: str, destination: Path) -> Path | None:
+        """
+        Look up a render and link it to destination.
+
+        Returns:
+            destination on a hit, None on a miss
+        """
+        with self._lock:
+            path = self._path(key)
+            if key not in self._entries or not path.exists():
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            os.utime(path)
+            _link_or_copy(path, destination)
+        return destination
+
+    def put(self, key: str, video_path: Path) -> None:
+        """Store a finished render and evict old entries if over budget."""
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            path = self._path(key)
+            _link_or_copy(Path(video_path), path)
+            self._forget(key)
+            size = path.stat().st_size
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _forget(self, key: str) -> None:
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+            logger.info(f"Evicted cached render {key}")
@@ -0,0 +1,126 @@
+"""Per-request render profiles.
+
+A profile fixes the output size, frame rate and frame count of a local
+render. Requests pick a quality (short side in pixels), an aspect ratio,
+a frame rate and a duration; anything left out falls back to the
+defaults in config (1080x1080, 24 fps, 120 frames).
+
+Pixel-valued effect parameters (pan distance, DOF radius, ...) are
+defined at the reference resolution and scaled by `scale_for()`, so a
+720p render looks like a downscaled 1080p one rather than a different
+animation.
+"""
+from dataclasses import dataclass
+
+from config import FPS, FRAME_COUNT, MAX_FPS, MAX_VIDEO_DURATION, MIN_FPS, MIN_VIDEO_DURATION, RESOLUTION
+
+# Short side in pixels
+QUALITY_PRESETS = {"480p": 480, "720p": 720, "1080p": 1080}
+
+# width:height
+ASPECT_RATIOS = {"1:1": (1, 1), "9:16": (9, 16), "16:9": (16, 9)}
+
+# Resolution effect parameters are tuned for
+REFERENCE_SHORT_SIDE = min(RESOLUTION)
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    width: int
+    height: int
+    fps: int
+    frame_count: int
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return (self.width, self.height)
+
+    @property
+    def duration(self) -> float:
+        return self.frame_count / self.fps
+
+    def to_dict(self) -> dict:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "fps": self.fps,
+            "frame_count": self.frame_count,
+            "duration": round(self.duration, 3),
+        }
+
+
+DEFAULT_PROFILE = RenderProfile(RESOLUTION[0], RESOLUTION[1], FPS, FRAME_COUNT)
+
+
+def _even(value: float) -> int:
+    # libx264 with yuv420p needs even dimensions
+    return max(2, int(round(value / 2)) * 2)
+
+
+def parse_render_profile(
+    quality: str | None = None,
+    aspect_ratio: str | None = None,
+    fps: int | None = None,
+    duration: float | None = None
+) -> RenderProfile:
+    """
+    Build a profile from request options, validating each one.
+
+    Args:
+        quality: One of QUALITY_PRESETS (short side of the output)
+        aspect_ratio: One of ASPECT_RATIOS
+        fps: Frames per second, MIN_FPS..MAX_FPS
+        duration: Video length in seconds, MIN_VIDEO_DURATION..MAX_VIDEO_DURATION
+
+    Returns:
+        The RenderProfile (DEFAULT_PROFILE when nothing is given)
+
+    Raises:
+        ValueError: If an option is unknown or out of range
+    """
+    if quality is None and aspect_ratio is None and fps is None and duration is None:
+        return DEFAULT_PROFILE
+
+    if quality is None:
+        short_side = REFERENCE_SHORT_SIDE
+    elif quality in QUALITY_PRESETS:
+        short_side = QUALITY_PRESETS[quality]
+    else:
+        raise ValueError(f"Unknown quality '{quality}'. Allowed: {list(QUALITY_PRESETS)}")
+
+    if aspect_ratio is None:
+        ratio_w, ratio_h = RESOLUTION
+    elif aspect_ratio in ASPECT_RATIOS:
+        ratio_w, ratio_h = ASPECT_RATIOS[aspect_ratio]
+    else:
+        raise ValueError(f"Unknown aspect ratio '{aspect_ratio}'. Allowed: {list(ASPECT_RATIOS)}")
+
+    if ratio_w <= ratio_h:
+        width, height = _even(short_side), _even(short_side * ratio_h / ratio_w)
+    else:
+        width, height = _even(short_side * ratio_w / ratio_h), _even(short_side)
+
+    fps = FPS if fps is None else fps
+    if not MIN_FPS <= fps <= MAX_FPS:
+        raise ValueError(f"fps must be between {MIN_FPS} and {MAX_FPS}")
+
+    duration = FRAME_COUNT / FPS if duration is None else duration
+    if not MIN_VIDEO_DURATION <= duration <= MAX_VIDEO_DURATION:
+        raise ValueError(f"duration must be between {MIN_VIDEO_DURATION} and {MAX_VIDEO_DURATION} seconds")
+
+    return RenderProfile(width, height, fps, max(2, int(round(duration * fps))))
+
+
+def scale_for(size: tuple[int, int]) -> float:
+    """Factor from reference-resolution pixels to pixels at size."""
+    return min(size) / REFERENCE_SHORT_SIDE
+
+
+def profile_options() -> dict:
+    """Allowed profile options, for API discovery."""
+    return {
+        "quality": list(QUALITY_PRESETS),
+        "aspect_ratio": list(ASPECT_RATIOS),
+        "fps": {"min": MIN_FPS, "max": MAX_FPS, "default": FPS},
+        "duration": {"min": MIN_VIDEO_DURATION, "max": MAX_VIDEO_DURATION, "default": FRAME_COUNT / FPS},
+    }
@@ -0,0 +1,228 @@
+"""Per-frame transform plans for the geometric effects.
+
+Perspective, zoom, pan and rotation are all projective maps of the frame,
+so for a given progress value they compose into a single 3x3 homography.
+Applying that with one cv2.warpPerspective replaces three or four separate
+resampling passes and avoids compounding interpolation blur.
+
+Plans depend only on the enabled effects and their parameters, the frame
+count and the frame size, so they are computed once and shared by every
+job with the same settings. Which effects are geometric is declared in
+services.effect_registry.
+
+Motion plans are derived from transform plans: the on-screen velocity
+of the content (pixels per frame) at the centres of a grid of tiles,
+which the motion blur follows. Sub-frame plans hold the homographies at
+several instants while the shutter is open, for accumulated motion blur.
+"""
+from functools import lru_cache
+import cv2
+import numpy as np
+
+from services.render_profile import scale_for
+
+MOTION_GRID = 6  # Motion is sampled at the centres of MOTION_GRID x MOTION_GRID tiles
+
+
+def perspective_matrix(progress: float, w: int, h: int) -> np.ndarray:
+    """3x3 homography of the 3D perspective tilt (see apply_perspective_transform)."""
+    pts1 = np.float32([[0, 0], [w, 0], [0, h], [w, h]])
+
+    # Corner offsets are pixels at the reference resolution
+    scale = scale_for((w, h))
+    offset_x = 20 * scale * np.sin(progress * np.pi * 2)
+    offset_y = 15 * scale * np.cos(progress * np.pi * 2)
+    lift = 5 * scale
+
+    pts2 = np.float32([
+        [offset_x, offset_y],
+        [w - offset_x * 0.5, offset_y + lift],
+        [offset_x * 0.5, h - offset_y],
+        [w - offset_x, h - offset_y + lift]
+    ])
+
+    return cv2.getPerspectiveTransform(pts1, pts2)
+
+
+def zoom_matrix(progress: float, w: int, h: int, zoom_range: float = 0.15) -> np.ndarray:
+    """3x3 matrix of the centre crop + resize done by apply_camera_zoom."""
+    zoom = 1.0 + zoom_range * np.sin(progress * np.pi * 3)
+
+    new_w = int(w / zoom)
+    new_h = int(h / zoom)
+    x_offset = (w - new_w) // 2
+    y_offset = (h - new_h) // 2
+
+    sx = w / new_w
+    sy = h / new_h
+
+    # Same pixel-centre convention as cv2.resize
+    return np.array([
+        [sx, 0, (0.5 - x_offset) * sx - 0.5],
+        [0, sy, (0.5 - y_offset) * sy - 0.5],
+        [0, 0, 1]
+    ], dtype=np.float64)
+
+
+def pan_matrix(progress: float, w: int, h: int, pan_amount: int = 25) -> np.ndarray:
+    """3x3 translation of apply_camera_pan."""
+    pan_x = int(pan_amount * np.sin(progress * np.pi * 2))
+    pan_y = int(pan_amount * np.cos(progress * np.pi * 2))
+
+    return np.array([
+        [1, 0, pan_x],
+        [0, 1, pan_y],
+        [0, 0, 1]
+    ], dtype=np.float64)
+
+
+def rotation_matrix(progress: float, w: int, h: int) -> np.ndarray:
+    """3x3 rotation + scale of apply_rotation_3d."""
+    center = (w // 2, h // 2)
+    angle = 360 * progress
+    scale = 1.0 + 0.1 * np.sin(progress * np.pi * 2)
+
+    return np.vstack([cv2.getRotationMatrix2D(center, angle, scale), [0, 0, 1]])
+
+
+def compose_transform(progress: float, steps: tuple, size: tuple[int, int]) -> np.ndarray | None:
+    """
+    Compose geometric effects into one homography.
+
+    Args:
+        progress: Animation progress (0.0 to 1.0)
+        steps: ((matrix_fn, ((param, value), ...)), ...) in application order,
+            where matrix_fn(progress, w, h, **params) returns a 3x3 matrix
+        size: Frame (width, height)
+
+    Returns:
+        3x3 matrix mapping source to output pixels, or None if steps is empty
+    """
+    w, h = size
+
+    matrix = None
+    for matrix_fn, params in steps:
+        step = matrix_fn(progress, w, h, **dict(params))
+        matrix = step if matrix is None else step @ matrix
+
+    return matrix
+
+
+@lru_cache(maxsize=32)
+def build_transform_plan(steps: tuple, frame_count: int, size: tuple[int, int]) -> tuple:
+    """
+    Homographies for every frame of a render.
+
+    Args:
+        steps: Geometric steps as accepted by compose_transform
+        frame_count: Number of frames in the video
+        size: Frame (width, height)
+
+    Returns:
+        Tuple of 3x3 matrices (or None entries when steps is empty)
+    """
+    plan = []
+    for i in range(frame_count):
+        progress = i / (frame_count - 1) if frame_count > 1 else 0.0
+        plan.append(compose_transform(progress, steps, size))
+    return tuple(plan)
+
+
+def _progress(time: float, frame_count: int) -> float:
+    return time / (frame_count - 1) if frame_count > 1 else 0.0
+
+
+def _project(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+    projected = matrix @ points
+    return projected[:2] / projected[2]
+
+
+@lru_cache(maxsize=32)
+def build_motion_plan(steps: tuple, frame_count: int, size: tuple[int, int], grid: int = MOTION_GRID) -> tuple:
+    """
+    On-screen velocity of the content for every frame of a render.
+
+    The content under an output pixel p of frame i came from source point
+    M_i^-1 p; its velocity is the central difference of where frames i-1
+    and i+1 put that source point (one-sided at the ends).
+
+    Args:
+        steps: Geometric steps as accepted by compose_transform
+        frame_count: Number of frames in the video
+        size: Frame (width, height)
+        grid: Tiles per side
+
+    Returns:
+        Tuple of (grid, grid, 2) float32 arrays of (dx, dy) in pixels per
+        frame at the tile centres (all zero when nothing moves)
+    """
+    w, h = size
+    still = np.zeros((grid, grid, 2), dtype=np.float32)
+    plan = build_transform_plan(steps, frame_count, size)
+    if frame_count < 2 or plan[0] is None:
+        return (still,) * frame_count
+
+    ys, xs = np.mgrid[0:grid, 0:grid]
+    centres = np.stack([
+        (xs.ravel() + 0.5) * w / grid,
+        (ys.ravel() + 0.5) * h / grid,
+        np.ones(grid * grid),
+    ])
+
+    motion = []
+    for i in range(frame_count):
+        before, after = max(i - 1, 0), min(i + 1, frame_count - 1)
+        source = np.linalg.inv(plan[i]) @ centres
+        velocity = (_project(plan[after], source) - _project(plan[before], source)) / (after - before)
+        motion.append(velocity.T.reshape(grid, grid, 2).astype(np.float32))
+    return tuple(motion)
+
+
+@lru_cache(maxsize=32)
+def build_subframe_plan(
+    steps: tuple,
+    frame_count: int,
+    size: tuple[int, int],
+    samples: int,
+    shutter: float
+) -> tuple:
+    """
+    Homographies at evenly spaced instants around every frame.
+
+    Frame i's samples span frame times i - shutter/2 .. i + shutter/2, so
+    a shutter of 0.5 (a 180 degree shutter angle) covers half of the
+    interval between frames.
+
+    Args:
+        steps: Geometric steps as accepted by compose_transform
+        frame_count: Number of frames in the video
+        size: Frame (width, height)
+        samples: Sub-frames per frame (at least 2)
+        shutter: Fraction of the frame interval the shutter is open
+
+    Returns:
+        Tuple with a tuple of `samples` 3x3 matrices per frame
+    """
+    offsets = np.linspace(-shutter / 2, shutter / 2, samples)
+    return tuple(
+        tuple(compose_transform(_progress(i + offset, frame_count), steps, size) for offset in offsets)
+        for i in range(frame_count)
+    )
+
+
+def apply_transform(
+    image: np.ndarray,
+    matrix: np.ndarray | None,
+    mode: int,
+    dst: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Warp image with a composed transform in a single resampling pass.
+
+    Writes into dst when given (it must not be image); an identity
+    transform returns image unchanged.
+    """
+    if matrix is None:
+        return image
+    h, w = image.shape[:2]
+    return cv2.warpPerspective(image, matrix, (w, h), dst=dst, flags=cv2.INTER_LINEAR, borderMode=mode)
@@ -1,10 +1,20 @@
 from pathlib import Path
+from typing import Iterable
 import os
+import numpy as np
 from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
-from config import FPS
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from config import FPS, LIVE_SEGMENT_SECONDS
+from services.encode_profile import DEFAULT_ENCODE_PROFILE, EncodeProfile
+from services.metrics import timed
 
 
-def create_video_from_frames(frames_dir: Path, output_path: Path, fps: int = FPS) -> Path:
+def create_video_from_frames(
+    frames_dir: Path,
+    output_path: Path,
+    fps: int = FPS,
+    encoding: EncodeProfile = DEFAULT_ENCODE_PROFILE
+) -> Path:
     """
     Create MP4 video from image sequence.
     
@@ -12,6 +22,7 @@ def create_video_from_frames(frames_dir: Path, output_path: Path, fps: int = FPS
         frames_dir: Directory containing ordered frame images
         output_path: Path for output MP4 file
         fps: Frames per second
+        encoding: Encoder profile (codec, preset, CRF, threads)
     
     Returns:
         Path to created video file
@@ -33,7 +44,10 @@ def create_video_from_frames(frames_dir: Path, output_path: Path, fps: int = FPS
     output_path.parent.mkdir(parents=True, exist_ok=True)
     clip.write_videofile(
         str(output_path),
-        codec='libx264',
+        codec=encoding.encoder,
+        preset=encoding.preset,
+        threads=encoding.threads or None,
+        ffmpeg_params=encoding.ffmpeg_params(),
         audio=False,
         verbose=False,
         logger=None
@@ -41,3 +55,108 @@ def create_video_from_frames(frames_dir: Path, output_path: Path, fps: int = FPS
     
     clip.close()
     return output_path
+
+
+LIVE_PLAYLIST = "index.m3u8"
+
+
+def _write_frame(writer: FFMPEG_VideoWriter, frame: np.ndarray) -> None:
+    # FFMPEG_VideoWriter.write_frame copies every frame with tobytes();
+    # write the array's own buffer instead
+    try:
+        writer.proc.stdin.write(np.ascontiguousarray(frame).data)
+    except IOError:
+        # Let moviepy raise its error with ffmpeg's output
+        writer.write_frame(frame)
+
+
+def _live_output(output_path: Path, live_dir: Path) -> tuple[str, list[str]]:
+    """
+    ffmpeg tee output writing the MP4 and an HLS playlist from one encode.
+    
+    The playlist is an EVENT playlist of fMP4 segments (init.mp4,
+    index0.m4s, ...) that grows while frames are encoded and is closed
+    with EXT-X-ENDLIST at the end. Keyframes are forced at every segment
+    boundary so segments are LIVE_SEGMENT_SECONDS long. If the HLS output
+    fails the MP4 is still written.
+    
+    Returns:
+        (ffmpeg output name, extra output options)
+    """
+    live_dir.mkdir(parents=True, exist_ok=True)
+    hls = ":".join([
+        "f=hls",
+        f"hls_time={LIVE_SEGMENT_SECONDS:g}",
+        "hls_playlist_type=event",
+        "hls_segment_type=fmp4",
+        # temp_file: segments and playlist appear only once complete
+        "hls_flags=independent_segments+temp_file",
+        "onfail=ignore",
+    ])
+    target = f"[{hls}]{live_dir / LIVE_PLAYLIST}|[f=mp4:movflags=+faststart]{output_path}"
+    params = [
+        "-force_key_frames", f"expr:gte(t,n_forced*{LIVE_SEGMENT_SECONDS:g})",
+        "-map", "0:v",
+        "-f", "tee",
+    ]
+    return target, params
+
+
+def write_video_from_frames(
+    frames: Iterable[np.ndarray],
+    output_path: Path,
+    fps: int = FPS,
+    encoding: EncodeProfile = DEFAULT_ENCODE_PROFILE,
+    live_dir: Path | None = None
+) -> Path:
+    """
+    Encode an MP4 video from in-memory RGB frames.
+    
+    Frames are piped as raw RGB buffers into a single persistent ffmpeg
+    process, so nothing is written to disk except the final video.
+    
+    Args:
+        frames: Iterable of RGB uint8 frames, all with the same shape
+        output_path: Path for output MP4 file
+        fps: Frames per second
+        encoding: Encoder profile (codec, preset, CRF, threads)
+        live_dir: If set, also write an HLS playlist and segments here while
+            encoding, so playback can start before the render finishes
+    
+    Returns:
+        Path to created video file
+    """
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("No frames to encode")
+    
+    h, w = first.shape[:2]
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    if live_dir is not None:
+        target, live_params = _live_output(output_path, live_dir)
+        params = encoding.ffmpeg_params(faststart=False) + live_params
+    else:
+        target, params = str(output_path), encoding.ffmpeg_params()
+    
+    writer = FFMPEG_VideoWriter(
+        target,
+        (w, h),
+        fps,
+        codec=encoding.encoder,
+        preset=encoding.preset,
+        threads=encoding.threads or None,
+        ffmpeg_params=params
+    )
+    try:
+        with timed("encode_frame"):
+            _write_frame(writer, first)
+        for frame in frames:
+            with timed("encode_frame"):
+                _write_frame(writer, frame)
+    finally:
+        with timed("mux"):
+            writer.close()
+    
+    return output_path
@@ -1,80 +1,10 @@
 from pathlib import Path
-import os
-from services.frame_generator_3d import generate_3d_transition_frames
-from services.video_creator import create_video_from_frames
-from config import DEFAULT_3D_EFFECTS
-from fastapi import HTTPException
-from services import providers
-
-
-def _call_external_provider_api(provider: str, prompt: str, img1_path: Path, img2_path: Path, output_path: Path) -> Path:
-    """Generic caller for external provider APIs.
-
-    Requires two environment variables to be set for the provider:
-      - {PROVIDER_UPPER}_API_URL  (endpoint URL)
-      - {PROVIDER_UPPER}_API_KEY  (bearer API key)  (optional)
-
-    The function posts multipart form-data with fields:
-      - prompt (string)
-      - initial_image (file)
-      - final_image (file)
-
-    The provider is expected to stream or return binary video/mp4 bytes.
-    """
-    try:
-        import requests
-    except Exception:
-        raise RuntimeError("Missing dependency 'requests'. Install it with: pip install requests")
-
-    prov = provider.upper()
-    url = os.environ.get(f"{prov}_API_URL")
-    api_key = os.environ.get(f"{prov}_API_KEY")
-
-    if not url:
-        raise HTTPException(status_code=400, detail=f"API URL for provider '{provider}' not configured. Set env {prov}_API_URL")
-
-    headers = {}
-    if api_key:
-        headers["Authorization"] = f"Bearer {api_key}"
-
-    files = {
-        "initial_image": open(img1_path, "rb"),
-        "final_image": open(img2_path, "rb"),
-    }
-
-    data = {"prompt": prompt or ""}
-
-    try:
-        resp = requests.post(url, headers=headers, files=files, data=data, timeout=120)
-    finally:
-        # close files
-        for f in files.values():
-            try:
-                f.close()
-            except Exception:
-                pass
-
-    if resp.status_code != 200:
-        # try to provide helpful message
-        try:
-            msg = resp.json()
-        except Exception:
-            msg = resp.text
-        raise HTTPException(status_code=502, detail=f"Provider {provider} error: {msg}")
-
-    content_type = resp.headers.get("Content-Type", "")
-    if "video" in content_type or resp.content[:4] == b"\x00\x00\x00\x18":
-        # write bytes to output
-        with open(output_path, "wb") as out_f:
-            out_f.write(resp.content)
-        return output_path
-    else:
-        # provider returned JSON or something unexpected
-        try:
-            body = resp.json()
-        except Exception:
-            body = resp.text
-        raise HTTPException(status_code=502, detail=f"Provider {provider} returned unexpected response: {body}")
+from services.frame_generator_3d import generate_3d_transition_frames, iter_3d_transition_frames, iter_sequence_frames
+from services.video_creator import create_video_from_frames, write_video_from_frames
+from services.parallel_render import iter_3d_transition_frames_parallel, iter_sequence_frames_parallel
+from services.render_profile import DEFAULT_PROFILE, RenderProfile
+from services.encode_profile import DEFAULT_ENCODE_PROFILE, EncodeProfile
+from config import DEFAULT_3D_EFFECTS, DEBUG_SAVE_FRAMES, RENDER_PROCESSES
 
 
 def process_images_to_video(
@@ -83,18 +13,28 @@ def process_images_to_video(
     temp_frame_dir: Path,
     output_video_path: Path,
     effects: dict = None,
-    provider: str = None,
-    prompt: str = None
+    profile: RenderProfile = DEFAULT_PROFILE,
+    encoding: EncodeProfile = DEFAULT_ENCODE_PROFILE,
+    live_dir: Path = None,
+    hashes: tuple[str, str] | None = None
 ) -> Path:
     """
     Process two images and create a 3D transition video.
     
+    External providers don't come through here; they run on the event
+    loop (services.providers_async).
+    
     Args:
         img1_path: Path to initial product image
         img2_path: Path to final product image
-        temp_frame_dir: Directory for temporary frame files
+        temp_frame_dir: Directory for frame files (only used when DEBUG_SAVE_FRAMES is set)
         output_video_path: Path for output video file
         effects: Dictionary of effect settings (optional)
+        profile: Output size, fps and frame count for local renders
+        encoding: Encoder settings for local renders
+        live_dir: Directory for a live HLS playlist written while rendering (optional)
+        hashes: SHA-256 of both images if already known (SavedUpload.sha256),
+            so decoded sources are looked up without re-hashing the files
     
     Returns:
         Path to created video file
@@ -103,16 +43,54 @@ def process_images_to_video(
     if effects is None:
         effects = DEFAULT_3D_EFFECTS
 
-    # If a provider is specified, delegate to external API
-    if provider:
-        # Provider may produce final mp4 directly
-        return providers.call_provider(provider, prompt, img1_path, img2_path, output_video_path)
+    if DEBUG_SAVE_FRAMES:
+        # Debug mode: keep every frame on disk for inspection
+        generate_3d_transition_frames(img1_path, img2_path, temp_frame_dir, effects, profile, hashes)
+        return create_video_from_frames(temp_frame_dir, output_video_path, fps=profile.fps, encoding=encoding)
 
-    # Generate transition frames with 3D effects
-    frames = generate_3d_transition_frames(img1_path, img2_path, temp_frame_dir, effects)
-
-    # Create video from frames
-    video_path = create_video_from_frames(temp_frame_dir, output_video_path)
+    # Stream frames with 3D effects straight into the encoder
+    if RENDER_PROCESSES > 1:
+        frames = iter_3d_transition_frames_parallel(img1_path, img2_path, effects, profile=profile, hashes=hashes)
+    else:
+        frames = iter_3d_transition_frames(img1_path, img2_path, effects, profile, hashes)
+    video_path = write_video_from_frames(
+        frames, output_video_path, fps=profile.fps, encoding=encoding, live_dir=live_dir
+    )
 
     return video_path
 
+
+def process_sequence_to_video(
+    image_paths: list[Path],
+    output_video_path: Path,
+    segment_effects: list[dict],
+    profile: RenderProfile = DEFAULT_PROFILE,
+    encoding: EncodeProfile = DEFAULT_ENCODE_PROFILE,
+    live_dir: Path = None,
+    hashes: list[str] | None = None
+) -> Path:
+    """
+    Create one video transitioning through an ordered list of images.
+    
+    All segments are rendered in a single streaming pass into one encoder,
+    so there are no intermediate videos and each image is decoded once.
+    
+    Args:
+        image_paths: Two or more product images, in order
+        output_video_path: Path for output video file
+        segment_effects: Effect settings for each transition (len(image_paths) - 1)
+        profile: Output size, fps and frames per transition
+        encoding: Encoder settings
+        live_dir: Directory for a live HLS playlist written while rendering (optional)
+        hashes: SHA-256 of every image if already known
+    
+    Returns:
+        Path to created video file
+    """
+    if RENDER_PROCESSES > 1:
+        frames = iter_sequence_frames_parallel(image_paths, segment_effects, profile=profile, hashes=hashes)
+    else:
+        frames = iter_sequence_frames(image_paths, segment_effects, profile, hashes)
+    return write_video_from_frames(
+        frames, output_video_path, fps=profile.fps, encoding=encoding, live_dir=live_dir
+    )
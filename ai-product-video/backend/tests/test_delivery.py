@@ -0,0 +1,111 @@
+"""Byte ranges, HEAD and conditional GET for finished videos.
+
+Run against the pinned dependencies (pip install -r requirements-dev.txt):
+range handling must not depend on what the installed Starlette's
+FileResponse supports.
+"""
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+import pytest
+
+from services.delivery import RangeNotSatisfiable, parse_range, video_response
+
+CONTENT = bytes(range(256)) * 40  # 10240 bytes
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    video = tmp_path / "video.mp4"
+    video.write_bytes(CONTENT)
+    app = FastAPI()
+
+    @app.api_route("/video", methods=["GET", "HEAD"])
+    async def get_video(request: Request):
+        return await video_response(request, video)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 10239)),
+    ("bytes=-100", (10140, 10239)),
+    ("bytes=-20000", (0, 10239)),
+    ("bytes=10000-20000", (10000, 10239)),
+    ("bytes=5-1", None),
+    ("bytes=0-1,5-9", None),
+    ("items=0-1", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(CONTENT)) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=10240-", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, len(CONTENT))
+
+
+def test_full_get(client):
+    response = client.get("/video")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["content-type"] == "video/mp4"
+    assert response.headers["content-disposition"] == 'inline; filename="product_video_3d.mp4"'
+
+
+def test_range_get(client):
+    response = client.get("/video", headers={"Range": "bytes=1000-1999"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[1000:2000]
+    assert response.headers["content-range"] == f"bytes 1000-1999/{len(CONTENT)}"
+    assert response.headers["content-length"] == "1000"
+
+
+def test_suffix_range_get(client):
+    response = client.get("/video", headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-10:]
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/video", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range(client):
+    etag = client.head("/video").headers["etag"]
+    matching = client.get("/video", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert matching.status_code == 206
+    assert matching.content == CONTENT[:10]
+
+    stale = client.get("/video", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == CONTENT
+
+
+def test_head(client):
+    response = client.head("/video")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["etag"].startswith('"')
+
+    ranged = client.head("/video", headers={"Range": "bytes=0-9"})
+    assert ranged.status_code == 206
+    assert ranged.content == b""
+    assert ranged.headers["content-length"] == "10"
+
+
+def test_conditional_get(client):
+    first = client.get("/video")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+    assert client.get("/video", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/video", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/video", headers={"If-None-Match": '"other"'}).status_code == 200
@@ -0,0 +1,48 @@
+"""Effect settings are validated and normalized before a job is queued."""
+import pytest
+
+import services.frame_generator_3d  # noqa: F401 (registers the effects)
+from services.effect_registry import build_pipeline, resolve_effects
+
+
+def _params(resolved, name):
+    return dict(dict(resolved)[name])
+
+
+@pytest.mark.parametrize("effects", [
+    {"zoom": {"zoom_range": [1]}},
+    {"zoom": {"zoom_range": "0.2"}},
+    {"zoom": {"zoom_range": float("nan")}},
+    {"zoom": {"zoom_range": -0.1}},
+    {"pan": {"pan_amount": 2.5}},
+    {"pan": {"pan_amount": True}},
+    {"depth_of_field": {"radius": 0}},
+    {"motion_blur": {"samples": 17}},
+    {"motion_blur": {"subframe_scale": 0}},
+    {"chromatic_aberration": {"max_shift": -1}},
+    {"chromatic_aberration": {"mode": "spiral"}},
+    {"zoom": {"enabled": "no"}},
+    {"zoom": "yes"},
+    {"zoom": {"speed": 2}},
+])
+def test_invalid_settings_raise(effects):
+    with pytest.raises(ValueError):
+        resolve_effects(effects)
+
+
+def test_values_are_normalized():
+    resolved = resolve_effects({"motion_blur": {"shutter": 1}, "pan": {"pan_amount": 10}})
+    assert _params(resolved, "motion_blur")["shutter"] == 1.0
+    assert isinstance(_params(resolved, "motion_blur")["shutter"], float)
+    assert _params(resolved, "pan")["pan_amount"] == 10
+
+
+def test_disabled_effects_are_dropped():
+    resolved = resolve_effects({"zoom": False, "pan": {"enabled": False}})
+    assert "zoom" not in dict(resolved)
+    assert "pan" not in dict(resolved)
+
+
+def test_pipeline_builds_from_overrides():
+    pipeline = build_pipeline({"zoom": {"zoom_range": 0.3}}, 10, (96, 96))
+    assert pipeline.stages
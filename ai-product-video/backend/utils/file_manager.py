@@ -1,6 +1,32 @@
+from dataclasses import dataclass
 from pathlib import Path
+import asyncio
+import hashlib
 import shutil
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from config import MAX_IMAGE_SIZE, MAX_IMAGE_PIXELS
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SavedUpload:
+    """An upload written to disk, with what the pipeline needs to know about it."""
+    path: Path
+    size: int
+    sha256: str
+    width: int
+    height: int
+    format: str | None
+
+
+def _probe_image(path: Path) -> tuple[int, int, str | None]:
+    """Return (width, height, format) from the image header."""
+    # Header only: Image.open doesn't decode pixel data
+    with Image.open(path) as img:
+        width, height = img.size
+        return width, height, img.format
 
 
 def create_directories(*dirs: Path) -> None:
@@ -9,12 +35,72 @@ def create_directories(*dirs: Path) -> None:
         directory.mkdir(parents=True, exist_ok=True)
 
 
-async def save_upload_file(upload_file: UploadFile, destination: Path) -> None:
-    """Save uploaded file to destination."""
+async def save_upload_file(
+    upload_file: UploadFile,
+    destination: Path,
+    max_size: int = MAX_IMAGE_SIZE
+) -> SavedUpload:
+    """
+    Stream an uploaded image to destination.
+    
+    The upload is written in chunks while its SHA-256 is computed, so it is
+    never held in memory whole; disk writes and the header probe run in a
+    worker thread so they don't block the event loop. Uploads larger than max_size are rejected
+    as soon as they cross the limit, and the image header is parsed to
+    check it is a real image and to get its dimensions.
+    
+    Returns:
+        SavedUpload with size, hash and image dimensions
+    
+    Raises:
+        HTTPException: 413 if the upload is too large, 400 if it isn't an image
+    """
+    declared = getattr(upload_file, "size", None)
+    if declared is not None and declared > max_size:
+        raise HTTPException(status_code=413, detail=f"Image exceeds {max_size} bytes")
+    
     destination.parent.mkdir(parents=True, exist_ok=True)
-    with destination.open("wb") as buffer:
-        content = await upload_file.read()
-        buffer.write(content)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with destination.open("wb") as buffer:
+            while True:
+                chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=413, detail=f"Image exceeds {max_size} bytes")
+                digest.update(chunk)
+                await asyncio.to_thread(buffer.write, chunk)
+        
+        try:
+            width, height, image_format = await asyncio.to_thread(_probe_image, destination)
+        except Exception:
+            raise HTTPException(status_code=400, detail=f"Uploaded file {upload_file.filename!r} is not a readable image")
+        if width * height > MAX_IMAGE_PIXELS:
+            raise HTTPException(status_code=413, detail=f"Image is {width}x{height}; at most {MAX_IMAGE_PIXELS} pixels allowed")
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    
+    return SavedUpload(
+        path=destination,
+        size=size,
+        sha256=digest.hexdigest(),
+        width=width,
+        height=height,
+        format=image_format,
+    )
+
+
+def file_sha256(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with Path(file_path).open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 def cleanup_files(*paths: Path) -> None:
@@ -13,7 +13,7 @@ const statusMessage = document.getElementById('statusMessage');
 const videoPreview = document.getElementById('videoPreview');
 const videoElement = document.getElementById('video');
 
-let generatedVideoBlob = null;
+let generatedVideoUrl = null;
 let initialImageFile = null;
 let finalImageFile = null;
 
@@ -153,7 +153,7 @@ async function generateVideo() {
         
         // Add effects as JSON query parameter
         const effectsJson = JSON.stringify(selectedEffects);
-        const url = `${API_URL}/generate-video?effects=${encodeURIComponent(effectsJson)}`;
+        const url = `${API_URL}/jobs?effects=${encodeURIComponent(effectsJson)}`;
         
         const response = await fetch(url, {
             method: 'POST',
@@ -161,21 +161,15 @@ async function generateVideo() {
         });
         
         if (!response.ok) {
-            let errorMessage = `HTTP Error: ${response.status}`;
-            try {
-                const errorData = await response.json();
-                errorMessage = errorData.detail || errorMessage;
-            } catch (e) {
-                // Ignore JSON parse errors
-            }
-            throw new Error(errorMessage);
+            throw new Error(await errorMessageFrom(response));
         }
         
-        generatedVideoBlob = await response.blob();
+        const job = await waitForJob(await response.json());
         
-        // Display video
-        const videoURL = URL.createObjectURL(generatedVideoBlob);
-        videoElement.src = videoURL;
+        // Stream the video: the player fetches byte ranges and can start
+        // and seek before the whole file has downloaded
+        generatedVideoUrl = `${API_URL}${job.video_url}`;
+        videoElement.src = generatedVideoUrl;
         videoPreview.style.display = 'block';
         downloadBtn.style.display = 'inline-block';
         
@@ -189,20 +183,44 @@ async function generateVideo() {
     }
 }
 
+async function errorMessageFrom(response) {
+    try {
+        const errorData = await response.json();
+        return errorData.detail || `HTTP Error: ${response.status}`;
+    } catch (e) {
+        // Ignore JSON parse errors
+        return `HTTP Error: ${response.status}`;
+    }
+}
+
+async function waitForJob(job) {
+    // Poll the render job until it finishes
+    while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const response = await fetch(`${API_URL}${job.status_url}`);
+        if (!response.ok) {
+            throw new Error(await errorMessageFrom(response));
+        }
+        job = { ...job, ...(await response.json()) };
+    }
+    if (job.status !== 'succeeded') {
+        throw new Error(job.error || `Job ${job.status}`);
+    }
+    return job;
+}
+
 function downloadVideo() {
-    if (!generatedVideoBlob) {
+    if (!generatedVideoUrl) {
         showStatus('error', 'No video to download.');
         return;
     }
     
-    const url = URL.createObjectURL(generatedVideoBlob);
     const link = document.createElement('a');
-    link.href = url;
+    link.href = `${generatedVideoUrl}?download=true`;
     link.download = 'product_video_3d.mp4';
     document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);
-    URL.revokeObjectURL(url);
     
     showStatus('success', 'Video downloaded successfully!');
 }